@@ -8,18 +8,14 @@ Versión refactorizada usando arquitectura modular con Managers.
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 from typing import Dict, Any
-import sys
-import os
 import logging
 
-# Agregar el directorio src al path para importar módulos
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-sys.path.append(os.path.join(os.path.dirname(__file__), 'config'))
+# src y config son paquetes: se importan desde la raíz del proyecto, que
+# Streamlit agrega al path al ejecutar app.py
 
 # Managers
 from src.managers import ForecastMainManager, ForecastLowProbManager
@@ -28,10 +24,14 @@ from src.managers import ForecastMainManager, ForecastLowProbManager
 from src.kpi_processor import KPIProcessor
 from src.llc_kpi_processor import LLCKPIProcessor
 from src.exporter import ForecastExporter, ReportGenerator
-from src.consolidated_report_generator import ConsolidatedReportGenerator
+from src.consolidated_report_generator import ConsolidatedReportGenerator, KPI_NON_MONTH_COLUMNS, last_positive_month_idx
 from src.ui_components import (
     render_file_uploader,
+    get_filter_options,
     render_filters_row,
+    apply_filters,
+    get_filter_signature,
+    describe_filters,
     render_totals_panel,
     render_export_buttons,
     export_to_excel_with_format,
@@ -41,15 +41,7 @@ from src.ui_components import (
     GridResponseHandler,
     create_section_header
 )
-from src.ui_styles import apply_custom_styles, format_currency
-from src.formatters import (
-    format_currency as fmt_currency, 
-    format_dataframe_currency_columns,
-    format_aggrid_currency_columns,
-    format_business_unit_icon,
-    format_compact_currency,
-    create_summary_stats
-)
+from src.ui_styles import apply_custom_styles
 from config.settings import *
 from st_aggrid import AgGrid
 
@@ -163,43 +155,44 @@ class ForecastApp:
         # Configuración de reglas de negocio editables
         st.sidebar.header("⚙️ Reglas de Negocio")
         
+        # Los widgets guardan su valor (en %) directamente en session_state vía key;
+        # la conversión a fracción se hace al procesar (get_business_rules)
         # Factor de castigo financiero con number_input
-        st.session_state.penalty_default = st.sidebar.number_input(
+        st.sidebar.number_input(
             "Factor Castigo (General) %",
             min_value=10, max_value=100, value=40, step=5,
-            help="Factor de castigo para probabilidades diferentes a 60%"
-        ) / 100.0
+            help="Factor de castigo para probabilidades diferentes a 60%",
+            key="penalty_default_pct"
+        )
         
-        st.session_state.penalty_60 = st.sidebar.number_input(
+        st.sidebar.number_input(
             "Factor Castigo (60%) %",
             min_value=10, max_value=100, value=60, step=5,
-            help="Factor de castigo para probabilidad del 60%"
-        ) / 100.0
+            help="Factor de castigo para probabilidad del 60%",
+            key="penalty_60_pct"
+        )
         
-        # Porcentajes de facturación
+        # Porcentajes de facturación: un solo data_editor (un rerun por edición)
+        # en lugar de cuatro sliders; las ediciones quedan en session_state
         with st.sidebar.expander("📊 Porcentajes de Facturación"):
-            st.session_state.inicio_pct = st.slider(
-                "INICIO (%)", min_value=0, max_value=100, value=30, step=5
-            ) / 100
-            
-            st.session_state.dr_pct = st.slider(
-                "DR (%)", min_value=0, max_value=100, value=30, step=5
-            ) / 100
-            
-            st.session_state.fat_pct = st.slider(
-                "FAT (%)", min_value=0, max_value=100, value=30, step=5
-            ) / 100
-            
-            st.session_state.sat_pct = st.slider(
-                "SAT (%)", min_value=0, max_value=100, value=10, step=5
-            ) / 100
+            st.data_editor(
+                self.forecast_main_manager.get_billing_percentages_frame(),
+                key=self.forecast_main_manager.BILLING_PERCENTAGES_KEY,
+                num_rows="fixed",
+                hide_index=True,
+                disabled=["Etapa"],
+                column_config={
+                    "%": st.column_config.NumberColumn(min_value=0, max_value=100, step=5, format="%d%%", required=True)
+                },
+                use_container_width=True
+            )
             
-            # Validar que sumen 100%
-            total_pct = (st.session_state.inicio_pct + st.session_state.dr_pct + 
-                        st.session_state.fat_pct + st.session_state.sat_pct)
+            # Validar que sumen 100% con los mismos valores que usa el cálculo
+            # (una celda vacía conserva su valor por defecto)
+            total_pct = sum(self.forecast_main_manager.get_billing_percentages().values())
             
-            if abs(total_pct - 1.0) > 0.01:
-                st.warning(f"⚠️ Los porcentajes suman {total_pct*100:.0f}%, no 100%")
+            if total_pct != 100:
+                st.warning(f"⚠️ Los porcentajes suman {total_pct:.0f}%, no 100%")
         
         # Opciones de exportación
         if hasattr(st.session_state, 'forecast_results'):
@@ -211,6 +204,9 @@ class ForecastApp:
             if st.sidebar.button("📄 Descargar CSV"):
                 self._export_csv()
             
+            if st.sidebar.button("🗜️ Descargar Parquet"):
+                self._export_parquet()
+            
             st.sidebar.markdown("---")
             
             # Reporte consolidado
@@ -221,21 +217,28 @@ class ForecastApp:
         
         # Información sobre reglas de negocio
         with st.sidebar.expander("ℹ️ Información de Reglas"):
+            # Reglas vigentes según los controles del sidebar
+            rules = self.forecast_main_manager.get_business_rules()
             col1, col2 = st.columns(2)
             
+            # Un solo bloque markdown por columna en lugar de un elemento por línea
             with col1:
-                st.markdown("**Reglas Generales:**")
-                st.markdown(f"- Lead Time mínimo: {BUSINESS_RULES.MIN_LEAD_TIME} semanas")
-                st.markdown(f"- Factor de castigo financiero: {BUSINESS_RULES.FINANCIAL_PENALTY_FACTOR_DEFAULT*100}%")
-                st.markdown(f"- Días para DR: {BUSINESS_RULES.DR_DAYS_OFFSET}")
-                st.markdown(f"- Días para SAT: {BUSINESS_RULES.SAT_DAYS_OFFSET}")
+                st.markdown(
+                    "**Reglas Generales:**\n"
+                    f"- Lead Time mínimo: {rules.MIN_LEAD_TIME} semanas\n"
+                    f"- Factor de castigo financiero: {rules.FINANCIAL_PENALTY_FACTOR_DEFAULT*100}%\n"
+                    f"- Días para DR: {rules.DR_DAYS_OFFSET}\n"
+                    f"- Días para SAT: {rules.SAT_DAYS_OFFSET}"
+                )
             
             with col2:
-                st.markdown("**Porcentajes de Facturación (sin PIA):**")
-                st.markdown(f"- INICIO: {BUSINESS_RULES.INICIO_PERCENTAGE*100}%")
-                st.markdown(f"- DR: {BUSINESS_RULES.DR_PERCENTAGE*100}%")
-                st.markdown(f"- FAT: {BUSINESS_RULES.FAT_PERCENTAGE*100}%")
-                st.markdown(f"- SAT: {BUSINESS_RULES.SAT_PERCENTAGE*100}%")
+                st.markdown(
+                    "**Porcentajes de Facturación (sin PIA):**\n"
+                    f"- INICIO: {rules.INICIO_PERCENTAGE*100}%\n"
+                    f"- DR: {rules.DR_PERCENTAGE*100}%\n"
+                    f"- FAT: {rules.FAT_PERCENTAGE*100}%\n"
+                    f"- SAT: {rules.SAT_PERCENTAGE*100}%"
+                )
     
     def _render_main_content(self):
         """Renderiza el contenido principal con pestañas."""
@@ -259,54 +262,55 @@ class ForecastApp:
             "💵 Costo Venta KPIs"
         ])
         
+        # Una sola consulta a session_state por rerun; cada pestaña recibe los resultados
+        forecast_results = st.session_state.get('forecast_results')
+        kpi_results = st.session_state.get('kpi_results')
+        
         with tabs[0]:
-            self._render_forecast_tab()
+            # Si se procesa un archivo aquí, las pestañas siguientes reciben los nuevos resultados
+            forecast_results = self._render_forecast_tab(forecast_results)
         
         with tabs[1]:
-            self._render_cost_of_sale_tab()
+            self._render_cost_of_sale_tab(forecast_results)
         
         with tabs[2]:
-            self._render_forecast_low_prob_tab()
+            forecast_results = self._render_forecast_low_prob_tab(forecast_results)
         
         with tabs[3]:
-            self._render_cost_of_sale_low_prob_tab()
+            self._render_cost_of_sale_low_prob_tab(forecast_results)
         
         with tabs[4]:
-            self._render_kpi_billing_tab()
+            self._render_kpi_billing_tab(kpi_results)
         
         with tabs[5]:
-            self._render_kpi_cost_tab()
+            self._render_kpi_cost_tab(kpi_results)
     
     # ========== FORECAST PRINCIPAL ==========
     
-    def _render_forecast_tab(self):
+    def _render_forecast_tab(self, results):
         """Pestaña de Forecast Pipeline - Usa ForecastMainManager."""
-        results = st.session_state.get('forecast_results')
-        self.forecast_main_manager.render_forecast_tab(results, render_file_uploader)
+        return self.forecast_main_manager.render_forecast_tab(results, render_file_uploader)
     
-    def _render_cost_of_sale_tab(self):
+    def _render_cost_of_sale_tab(self, results):
         """Pestaña de Costo de Venta - Usa ForecastMainManager."""
-        results = st.session_state.get('forecast_results')
         self.forecast_main_manager.render_cost_of_sale_tab(results)
     
     # ========== FORECAST <60% ==========
     
-    def _render_forecast_low_prob_tab(self):
+    def _render_forecast_low_prob_tab(self, results):
         """Pestaña de Forecast <60% - Usa ForecastLowProbManager."""
-        results = st.session_state.get('forecast_results')
-        self.forecast_low_prob_manager.render_forecast_tab(results, render_file_uploader)
+        return self.forecast_low_prob_manager.render_forecast_tab(results, render_file_uploader)
     
-    def _render_cost_of_sale_low_prob_tab(self):
+    def _render_cost_of_sale_low_prob_tab(self, results):
         """Pestaña de Costo de Venta <60% - Usa ForecastLowProbManager."""
-        results = st.session_state.get('forecast_results')
         self.forecast_low_prob_manager.render_cost_of_sale_tab(results)
     
     # ========== KPIs ==========
     
-    def _render_kpi_billing_tab(self):
+    def _render_kpi_billing_tab(self, kpi_results):
         """Pestaña de KPIs Billing."""
-        if hasattr(st.session_state, 'kpi_results'):
-            self._render_kpi_billing_table()
+        if kpi_results is not None:
+            self._render_kpi_billing_table(kpi_results)
         else:
             self._render_kpi_empty_state()
     
@@ -352,10 +356,10 @@ class ForecastApp:
         
         st.info("👆 Sube al menos un archivo y procésalo. Se pueden procesar ambos archivos simultáneamente.")
     
-    def _render_kpi_cost_tab(self):
+    def _render_kpi_cost_tab(self, kpi_results):
         """Pestaña de Costo de Venta KPIs."""
-        if hasattr(st.session_state, 'kpi_results'):
-            self._render_kpi_cost_of_sale_table()
+        if kpi_results is not None:
+            self._render_kpi_cost_of_sale_table(kpi_results)
         else:
             st.info("👈 Procesa KPIs en la pestaña 'KPIs PM-008' primero")
     
@@ -480,9 +484,53 @@ class ForecastApp:
         logger.info(f"Resultados combinados: {combined['filtered_count']} proyectos totales")
         return combined
     
-    def _render_kpi_billing_table(self):
+    @staticmethod
+    def _get_kpi_dataframe(kpi_results: Dict) -> pd.DataFrame:
+        """
+        DataFrame de KPIs construido una sola vez por procesamiento.
+        Location, BU y Status se guardan como categóricas: los filtros comparan
+        códigos enteros y las opciones salen directamente de las categorías.
+        
+        Args:
+            kpi_results: Resultados combinados de KPIs
+            
+        Returns:
+            DataFrame con los datos de KPIs
+        """
+        if 'df' not in kpi_results:
+            df = pd.DataFrame(kpi_results['data'])
+            for column in ('Location', 'BU', 'Status'):
+                if column in df.columns:
+                    df[column] = df[column].astype('category')
+            kpi_results['df'] = df
+        return kpi_results['df']
+    
+    def _filter_kpi_dataframe(self, kpi_results: Dict, selected_filters: Dict) -> pd.DataFrame:
+        """
+        Aplica los filtros de KPIs memorizando el resultado por combinación de
+        filtros. Los reruns que solo cambian controles de visualización (p. ej.
+        "Agrupar por BU") reutilizan la selección ya calculada.
+        
+        Args:
+            kpi_results: Resultados combinados de KPIs
+            selected_filters: Diccionario {columna: valor seleccionado}
+            
+        Returns:
+            DataFrame filtrado
+        """
+        cache = kpi_results.setdefault('filtered_dfs', {})
+        filter_key = get_filter_signature(selected_filters)
+        if filter_key not in cache:
+            cache[filter_key] = apply_filters(
+                self._get_kpi_dataframe(kpi_results),
+                selected_filters
+            )
+        # Copia superficial para que AgGrid no altere el resultado memorizado
+        return cache[filter_key].copy(deep=False)
+    
+    def _render_kpi_billing_table(self, kpi_results):
         """Renderiza la tabla de KPIs PM-008."""
-        if not hasattr(st.session_state, 'kpi_results'):
+        if kpi_results is None:
             st.warning("⚠️ No hay datos de KPIs disponibles. Por favor, carga y procesa el archivo de KPIs PM-008.")
             
             with st.expander("📖 ¿Cómo usar esta función?"):
@@ -501,8 +549,6 @@ class ForecastApp:
                 """)
             return
         
-        kpi_results = st.session_state.kpi_results
-        
         if not kpi_results['data']:
             st.info("ℹ️ No hay proyectos con status 'Abierto' u 'On Hold' en el archivo de KPIs.")
             return
@@ -529,7 +575,7 @@ class ForecastApp:
                 st.metric("🚦 Abierto / On Hold", f"{abierto} / {on_hold}")
         
         # Convertir a DataFrame
-        df_kpis = pd.DataFrame(kpi_results['data'])
+        df_kpis = self._get_kpi_dataframe(kpi_results)
         
         # Mostrar warning si hay proyectos con Costo de Venta TBD
         if summary.get('tbd_projects') and len(summary['tbd_projects']) > 0:
@@ -546,44 +592,40 @@ class ForecastApp:
         col_filter1, col_filter2, col_filter3, col_filter4 = st.columns(4)
         
         with col_filter1:
-            location_options = ['Todas'] + sorted(df_kpis['Location'].dropna().unique().tolist())
+            location_options = get_filter_options(df_kpis, 'Location', 'Todas')
             selected_location = st.selectbox("Filtrar por Location:", location_options, key="kpi_location_filter")
         
         with col_filter2:
-            bu_options = ['Todas'] + sorted(df_kpis['BU'].dropna().unique().tolist())
+            bu_options = get_filter_options(df_kpis, 'BU', 'Todas')
             selected_bu = st.selectbox("Filtrar por BU:", bu_options, key="kpi_bu_filter")
         
         with col_filter3:
-            status_options = ['Todos'] + sorted(df_kpis['Status'].dropna().unique().tolist())
+            status_options = get_filter_options(df_kpis, 'Status', 'Todos')
             selected_status = st.selectbox("Filtrar por Status:", status_options, key="kpi_status_filter")
         
         with col_filter4:
             show_grouping = st.checkbox("Agrupar por BU", value=False, key="kpi_group_by_bu")
         
         # Aplicar filtros
-        df_filtered = df_kpis.copy()
-        
-        if selected_location != 'Todas':
-            df_filtered = df_filtered[df_filtered['Location'] == selected_location]
-        
-        if selected_bu != 'Todas':
-            df_filtered = df_filtered[df_filtered['BU'] == selected_bu]
-        
-        if selected_status != 'Todos':
-            df_filtered = df_filtered[df_filtered['Status'] == selected_status]
+        selected_filters = {
+            'Location': selected_location,
+            'BU': selected_bu,
+            'Status': selected_status
+        }
+        df_filtered = self._filter_kpi_dataframe(kpi_results, selected_filters)
+        if df_filtered.empty:
+            filter_text = describe_filters(get_filter_signature(selected_filters))
+            st.info(f"ℹ️ {INFO_MESSAGES['no_filter_results'].format(filter_text)}")
+            return
         
         # Mostrar panel de totales
         render_totals_panel(df_filtered, "TOTALES KPIs BILLING")
         
-        # Configurar AG-Grid
-        gb = AGGridConfigurator.configure_forecast_table(df_filtered)
-        
-        # Configurar agrupación
-        if selected_bu != 'Todas' or not show_grouping:
-            gb.configure_column("BU", rowGroup=False, hide=False)
-            gb.configure_grid_options(groupDefaultExpanded=0)
-        else:
-            gb.configure_grid_options(groupDefaultExpanded=1)
+        # Configurar AG-Grid (opciones cacheadas por esquema de columnas)
+        grid_options = AGGridConfigurator.get_forecast_grid_options(
+            df_filtered,
+            group_by_bu=selected_bu == 'Todas' and show_grouping
+        )
         
         # Renderizar tabla
         grid_config = GRID_CONFIGS['forecast_main'].copy()
@@ -594,27 +636,27 @@ class ForecastApp:
         
         AgGrid(
             df_filtered,
-            gridOptions=gb.build(),
+            gridOptions=grid_options,
             height=grid_config['height'],
             theme=grid_config['theme'],
             allow_unsafe_jscode=grid_config['allow_unsafe_jscode'],
             update_mode=grid_config['update_mode'],
+            update_on=grid_config['update_on'],
             fit_columns_on_grid_load=grid_config['fit_columns_on_grid_load'],
-            enable_enterprise_modules=grid_config['enable_enterprise_modules']
+            enable_enterprise_modules=grid_config['enable_enterprise_modules'],
+            key="kpi_billing_grid"
         )
         
         # Exportación
         #st.markdown("#### 📥 Exportar Datos")
         #render_export_buttons(df_filtered, 'kpis_pm008', 'export_kpi')
     
-    def _render_kpi_cost_of_sale_table(self):
+    def _render_kpi_cost_of_sale_table(self, kpi_results):
         """Renderiza la tabla de Costo de Venta de KPIs PM-008."""
-        if not hasattr(st.session_state, 'kpi_results'):
+        if kpi_results is None:
             st.warning("⚠️ No hay datos de KPIs disponibles.")
             return
         
-        kpi_results = st.session_state.kpi_results
-        
         if not kpi_results['data']:
             st.info("ℹ️ No hay proyectos con costo de venta.")
             return
@@ -622,88 +664,61 @@ class ForecastApp:
         create_section_header("KPIs PM-008 - Costo de Venta", "Costo de venta de proyectos activos", "💵")
         
         # Convertir a DataFrame
-        df_kpis = pd.DataFrame(kpi_results['data'])
+        df_kpis = self._get_kpi_dataframe(kpi_results)
         
         # Filtros
         st.markdown("#### 🔍 Filtros")
         col_filter1, col_filter2, col_filter3, col_filter4 = st.columns(4)
         
         with col_filter1:
-            location_options = ['Todas'] + sorted(df_kpis['Location'].dropna().unique().tolist())
+            location_options = get_filter_options(df_kpis, 'Location', 'Todas')
             selected_location_cost = st.selectbox("Filtrar por Location:", location_options, key="kpi_cost_location_filter")
         
         with col_filter2:
-            bu_options = ['Todas'] + sorted(df_kpis['BU'].dropna().unique().tolist())
+            bu_options = get_filter_options(df_kpis, 'BU', 'Todas')
             selected_bu_cost = st.selectbox("Filtrar por BU:", bu_options, key="kpi_cost_bu_filter")
         
         with col_filter3:
-            status_options = ['Todos'] + sorted(df_kpis['Status'].dropna().unique().tolist())
+            status_options = get_filter_options(df_kpis, 'Status', 'Todos')
             selected_status_cost = st.selectbox("Filtrar por Status:", status_options, key="kpi_cost_status_filter")
         
         with col_filter4:
             show_grouping_cost = st.checkbox("Agrupar por BU", value=False, key="kpi_cost_group_by_bu")
         
         # Aplicar filtros
-        df_filtered = df_kpis.copy()
-        
-        if selected_location_cost != 'Todas':
-            df_filtered = df_filtered[df_filtered['Location'] == selected_location_cost]
-        
-        if selected_bu_cost != 'Todas':
-            df_filtered = df_filtered[df_filtered['BU'] == selected_bu_cost]
-        
-        if selected_status_cost != 'Todos':
-            df_filtered = df_filtered[df_filtered['Status'] == selected_status_cost]
+        selected_filters = {
+            'Location': selected_location_cost,
+            'BU': selected_bu_cost,
+            'Status': selected_status_cost
+        }
+        df_filtered = self._filter_kpi_dataframe(kpi_results, selected_filters)
+        if df_filtered.empty:
+            filter_text = describe_filters(get_filter_signature(selected_filters))
+            st.info(f"ℹ️ {INFO_MESSAGES['no_filter_results'].format(filter_text)}")
+            return
         
         # Crear tabla con costo de venta
-        month_cols = [col for col in df_filtered.columns 
-                     if col not in ['Proyecto', 'BU', 'Location', 'Status', 'Customer', 'Total PO', '% Facturación', 'Costo de Venta']]
+        month_cols = [col for col in df_filtered.columns if col not in KPI_NON_MONTH_COLUMNS]
         
         df_cost = df_filtered[['Proyecto', 'BU', 'Location', 'Status', 'Customer', 'Costo de Venta']].copy()
         
-        # Agregar columnas de meses con costo de venta
-        for month in month_cols:
-            df_cost[month] = 0
-        
-        # Para cada proyecto, encontrar el último mes con facturación
-        for idx in df_filtered.index:
-            last_billing_month = None
-            for month in month_cols:
-                if df_filtered.loc[idx, month] > 0:
-                    last_billing_month = month
-            
-            if last_billing_month:
-                df_cost.loc[idx, last_billing_month] = df_filtered.loc[idx, 'Costo de Venta']
+        # Costo de venta en el último mes con facturación de cada proyecto
+        month_values = df_filtered[month_cols].to_numpy(dtype=np.float64)
+        last_month_idx, has_billing = last_positive_month_idx(month_values)
+        rows = np.flatnonzero(has_billing)
+        cost_matrix = np.zeros(month_values.shape)
+        cost_matrix[rows, last_month_idx[rows]] = df_filtered['Costo de Venta'].to_numpy()[rows]
+        df_cost[month_cols] = cost_matrix
         
         # Mostrar panel de totales
         render_totals_panel(df_cost, "TOTALES COSTO VENTA KPIs")
         
-        # Configurar AG-Grid
-        gb = AGGridConfigurator.configure_forecast_table(df_cost)
-        
-        if selected_bu_cost != 'Todas' or not show_grouping_cost:
-            gb.configure_column("BU", rowGroup=False, hide=False)
-            gb.configure_grid_options(groupDefaultExpanded=0)
-        else:
-            gb.configure_grid_options(groupDefaultExpanded=1)
-        
-        # Estilo para celdas con costo
-        from st_aggrid import JsCode
-        cell_style_jscode = JsCode("""
-        function(params) {
-            if (params.value && params.value > 0) {
-                return {
-                    'backgroundColor': '#FCB72F',
-                    'color': '#000000',
-                    'fontWeight': 'bold'
-                }
-            }
-            return null;
-        }
-        """)
-        
-        for month in month_cols:
-            gb.configure_column(month, cellStyle=cell_style_jscode)
+        # Configurar AG-Grid (opciones cacheadas por esquema; celdas con costo resaltadas)
+        grid_options = AGGridConfigurator.get_forecast_grid_options(
+            df_cost,
+            group_by_bu=selected_bu_cost == 'Todas' and show_grouping_cost,
+            highlight_columns=tuple(month_cols)
+        )
         
         # Renderizar tabla
         grid_config = GRID_CONFIGS['forecast_main'].copy()
@@ -714,13 +729,15 @@ class ForecastApp:
         
         AgGrid(
             df_cost,
-            gridOptions=gb.build(),
+            gridOptions=grid_options,
             height=grid_config['height'],
             theme=grid_config['theme'],
             allow_unsafe_jscode=grid_config['allow_unsafe_jscode'],
             update_mode=grid_config['update_mode'],
+            update_on=grid_config['update_on'],
             fit_columns_on_grid_load=grid_config['fit_columns_on_grid_load'],
-            enable_enterprise_modules=grid_config['enable_enterprise_modules']
+            enable_enterprise_modules=grid_config['enable_enterprise_modules'],
+            key="kpi_cost_grid"
         )
         
         # Exportación
@@ -760,6 +777,9 @@ class ForecastApp:
             results = st.session_state.forecast_results
             
             csv_content = self.exporter.export_forecast_table_to_csv(results['forecast_table'])
+            if csv_content is None:
+                st.warning("⚠️ No hay datos para exportar")
+                return
             
             filename = self.exporter.create_downloadable_filename("forecast").replace('.xlsx', '.csv')
             
@@ -775,13 +795,62 @@ class ForecastApp:
         except Exception as e:
             st.error(f"❌ Error al exportar CSV: {str(e)}")
     
+    def _export_parquet(self):
+        """Exporta tabla de forecast a Parquet."""
+        try:
+            results = st.session_state.forecast_results
+            
+            parquet_content = self.exporter.export_forecast_table_to_parquet(results['forecast_table'])
+            if parquet_content is None:
+                st.warning("⚠️ No hay datos para exportar")
+                return
+            
+            filename = self.exporter.create_downloadable_filename("forecast").replace('.xlsx', '.parquet')
+            
+            st.download_button(
+                label="🗜️ Descargar Parquet",
+                data=parquet_content,
+                file_name=filename,
+                mime="application/vnd.apache.parquet"
+            )
+            
+            st.success("✅ Archivo Parquet preparado para descarga")
+            
+        except Exception as e:
+            st.error(f"❌ Error al exportar Parquet: {str(e)}")
+    
+    def _get_consolidated_report_bytes(self, forecast_results: Dict, kpi_results: Dict) -> bytes:
+        """
+        Genera el reporte consolidado, memorizado mientras los resultados no cambien.
+        
+        Cada procesamiento crea dicts nuevos de resultados, así que basta comparar
+        identidad con los usados en la última generación (se guardan las
+        referencias, por lo que no pueden reciclarse sus ids).
+        
+        Args:
+            forecast_results: Resultados de forecast (o None)
+            kpi_results: Resultados de KPIs (o None)
+            
+        Returns:
+            bytes: Contenido del archivo Excel
+        """
+        cached = st.session_state.get('consolidated_report_cache')
+        if cached and cached[0] is forecast_results and cached[1] is kpi_results:
+            return cached[2]
+        
+        generator = ConsolidatedReportGenerator()
+        excel_buffer = generator.generate_report(
+            forecast_results=forecast_results,
+            kpi_results=kpi_results
+        )
+        report_bytes = excel_buffer.getvalue()
+        st.session_state.consolidated_report_cache = (forecast_results, kpi_results, report_bytes)
+        return report_bytes
+    
     def _generate_consolidated_report(self):
         """Genera reporte consolidado completo usando el template."""
         try:
             with st.spinner("Generando reporte consolidado..."):
-                # Inicializar generador
-                generator = ConsolidatedReportGenerator()
-                
                 # Obtener datos de forecast (ambos tipos)
                 forecast_results = None
                 if hasattr(st.session_state, 'forecast_results'):
@@ -797,11 +866,8 @@ class ForecastApp:
                     st.warning("⚠️ No hay datos procesados. Procesa al menos un Forecast o KPIs primero.")
                     return
                 
-                # Generar reporte
-                excel_buffer = generator.generate_report(
-                    forecast_results=forecast_results,
-                    kpi_results=kpi_results
-                )
+                # Generar reporte (reutiliza el último si los resultados no cambiaron)
+                report_bytes = self._get_consolidated_report_bytes(forecast_results, kpi_results)
                 
                 # Crear nombre de archivo
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M")
@@ -810,7 +876,7 @@ class ForecastApp:
                 # Botón de descarga
                 st.download_button(
                     label="⬇️ Descargar Reporte Consolidado",
-                    data=excel_buffer.getvalue(),
+                    data=report_bytes,
                     file_name=filename,
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     key="download_consolidated"
@@ -837,8 +903,8 @@ class ForecastApp:
                         included.append("✓ Costo de venta por Backlog PM (KPIs)")
                 
                 if included:
-                    for item in included:
-                        st.markdown(f"  {item}")
+                    # Un solo mensaje al frontend; "  \n" es salto de línea en markdown
+                    st.markdown("  \n".join(included))
                 
         except FileNotFoundError as e:
             st.error("❌ No se encontró el archivo Template.xlsx. Asegúrate de que existe en la carpeta 'data/'")
@@ -5,7 +5,8 @@ Este módulo contiene todas las constantes y configuraciones utilizadas
 en la aplicación para mantener la consistencia y facilitar el mantenimiento.
 """
 
-from typing import Dict, List
+from importlib.util import find_spec
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 
 
@@ -53,6 +54,10 @@ class ExcelConfig:
     # Fila donde comienzan los headers (0-indexed)
     HEADER_ROW: int = 12
     
+    # Motor de lectura de xlsx: calamine (Rust, mucho más rápido que openpyxl)
+    # si python-calamine está instalado; None deja que pandas use openpyxl
+    READ_ENGINE: Optional[str] = 'calamine' if find_spec('python_calamine') else None
+    
     # Columnas requeridas en el archivo
     REQUIRED_COLUMNS: List[str] = None
     
@@ -121,7 +126,8 @@ INFO_MESSAGES: Dict[str, str] = {
     'processing_complete': 'Procesamiento completado exitosamente.',
     'data_filtered': 'Datos filtrados: {} registros válidos de {} totales.',
     'forecast_generated': 'Forecast generado: ${:,.2f} en {} eventos de facturación.',
-    'export_success': 'Archivo exportado exitosamente.'
+    'export_success': 'Archivo exportado exitosamente.',
+    'no_filter_results': 'Sin resultados para los filtros seleccionados ({}).'
 }
 
 
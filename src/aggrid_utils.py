@@ -2,10 +2,14 @@
 Utilidades para configurar AG-Grid con estilos y funcionalidades optimizadas.
 """
 
+import streamlit as st
 from st_aggrid import GridOptionsBuilder, JsCode
 import pandas as pd
 from typing import Dict, List, Optional, Any
 
+# Columnas de texto y de totales de las tablas de forecast/KPIs: el resto son meses
+_NON_MONTH_COLUMNS = frozenset(['Proyecto', 'BU', 'Empresa', 'Company', 'Location', 'Status', 'Customer', '% Facturación', 'Amount Total', 'Gross Margin', 'Costo de Venta'])
+
 
 class AGGridConfigurator:
     """Configurador de AG-Grid para diferentes tipos de tablas."""
@@ -23,6 +27,11 @@ class AGGridConfigurator:
         'turquoise': '#40E0D0'
     }
     
+    # Tablas con más filas que este umbral se paginan: el navegador solo construye
+    # las filas de la página visible en lugar de la tabla completa
+    PAGINATION_THRESHOLD = 500
+    PAGINATION_PAGE_SIZE = 100
+    
     @staticmethod
     def get_currency_formatter() -> JsCode:
         """Formateador de moneda para AG-Grid con 2 decimales."""
@@ -77,6 +86,39 @@ class AGGridConfigurator:
         }
         """)
     
+    @staticmethod
+    def get_cost_highlight_style() -> JsCode:
+        """Resalta en naranja las celdas con costo de venta (> 0)."""
+        return JsCode("""
+        function(params) {
+            if (params.value && params.value > 0) {
+                return {
+                    'backgroundColor': '#FCB72F',
+                    'color': '#000000',
+                    'fontWeight': 'bold'
+                }
+            }
+            return null;
+        }
+        """)
+    
+    @classmethod
+    def get_currency_column_types(cls) -> Dict:
+        """
+        Tipos de columna de moneda para gridOptions['columnTypes'].
+        
+        El formateador y el estilo se definen una sola vez: cada columna solo
+        referencia el tipo, en lugar de repetir el código JS en cada columna.
+        """
+        currency_formatter = cls.get_currency_formatter()
+        return {
+            'currencyColumn': {'valueFormatter': currency_formatter},
+            'currencyMonthColumn': {
+                'valueFormatter': currency_formatter,
+                'cellStyle': cls.get_cell_style_currency()
+            }
+        }
+    
     @staticmethod
     def get_bu_cell_renderer() -> JsCode:
         """Renderer para celdas de BU con iconos."""
@@ -95,8 +137,14 @@ class AGGridConfigurator:
         """)
     
     @classmethod
-    def configure_forecast_table(cls, df: pd.DataFrame) -> GridOptionsBuilder:
-        """Configura AG-Grid para la tabla principal de forecast."""
+    def configure_forecast_table(cls, df: pd.DataFrame, group_by_bu: bool = True) -> GridOptionsBuilder:
+        """
+        Configura AG-Grid para la tabla principal de forecast.
+        
+        Args:
+            df: DataFrame con los datos de la tabla
+            group_by_bu: Si True, agrupa las filas por BU (expandidas por defecto)
+        """
         gb = GridOptionsBuilder.from_dataframe(df)
         
         # Configuración general
@@ -112,18 +160,17 @@ class AGGridConfigurator:
         gb.configure_column("BU", 
             pinned="left", 
             width=100, 
-            cellRenderer=cls.get_bu_cell_renderer()
+            cellRenderer=cls.get_bu_cell_renderer(),
+            rowGroup=group_by_bu,
+            hide=False
         )
         
         # Configurar columnas de meses (todas las que no sean Proyecto, BU, Empresa, etc)
-        non_numeric_columns = ['Proyecto', 'BU', 'Empresa', 'Company', 'Location', 'Status', 'Customer', '% Facturación', 'Amount Total', 'Gross Margin', 'Costo de Venta']
-        month_columns = [col for col in df.columns if col not in non_numeric_columns]
+        month_columns = [col for col in df.columns if col not in _NON_MONTH_COLUMNS]
         
         for col in month_columns:
             gb.configure_column(col,
-                type=["numericColumn"],
-                valueFormatter=cls.get_currency_formatter(),
-                cellStyle=cls.get_cell_style_currency(),
+                type=["numericColumn", "currencyMonthColumn"],
                 width=120,
                 aggFunc="sum"  # Suma automática en agrupaciones
             )
@@ -172,45 +219,65 @@ class AGGridConfigurator:
         # Configurar columnas de costo de venta con formato de moneda
         if 'Amount Total' in df.columns:
             gb.configure_column('Amount Total',
-                type=["numericColumn"],
-                valueFormatter=cls.get_currency_formatter(),
+                type=["numericColumn", "currencyColumn"],
                 width=140
             )
         
         if 'Gross Margin' in df.columns:
             gb.configure_column('Gross Margin',
-                type=["numericColumn"],
-                valueFormatter=cls.get_currency_formatter(),
+                type=["numericColumn", "currencyColumn"],
                 width=140
             )
         
         if 'Costo de Venta' in df.columns:
             gb.configure_column('Costo de Venta',
-                type=["numericColumn"],
-                valueFormatter=cls.get_currency_formatter(),
+                type=["numericColumn", "currencyColumn"],
                 width=140
             )
         
-        # Configuraciones avanzadas
+        # Configuraciones avanzadas y agrupación por BU en una sola llamada
         gb.configure_grid_options(
+            columnTypes=cls.get_currency_column_types(),
             enableRangeSelection=True,
             enableCharts=True,
             suppressMenuHide=True,
             animateRows=True,
             rowHeight=40,
-            headerHeight=45
-        )
-        
-        # Agrupación por BU
-        gb.configure_column("BU", rowGroup=True, hide=False)
-        gb.configure_grid_options(
-            groupDefaultExpanded=1,
+            headerHeight=45,
+            groupDefaultExpanded=1 if group_by_bu else 0,
             suppressAggFuncInHeader=True,
             groupIncludeFooter=True
         )
         
         return gb
     
+    @classmethod
+    def get_forecast_grid_options(cls, df: pd.DataFrame, group_by_bu: bool = True,
+                                  highlight_columns: tuple = ()) -> Dict:
+        """
+        gridOptions de la tabla de forecast, cacheadas por esquema de columnas.
+        
+        La configuración solo depende de los nombres y tipos de las columnas, no de
+        los valores, así que cambiar un filtro reutiliza las opciones ya construidas.
+        Las tablas grandes (más de PAGINATION_THRESHOLD filas) se muestran paginadas.
+        
+        Args:
+            df: DataFrame con los datos de la tabla
+            group_by_bu: Si True, agrupa las filas por BU
+            highlight_columns: Columnas cuyas celdas con costo se resaltan
+            
+        Returns:
+            Dict con gridOptions listo para AgGrid
+        """
+        return _cached_forecast_grid_options(
+            tuple(map(str, df.columns)),
+            tuple(map(str, df.dtypes)),
+            group_by_bu,
+            tuple(highlight_columns),
+            len(df) > cls.PAGINATION_THRESHOLD,
+            df.iloc[:0]
+        )
+    
     @classmethod
     def configure_details_table(cls, df: pd.DataFrame) -> GridOptionsBuilder:
         """Configura AG-Grid para la tabla de detalles de eventos."""
@@ -313,6 +380,37 @@ class AGGridConfigurator:
         return min(calculated_height, max_height)
 
 
+def _to_plain_options(value: Any) -> Any:
+    """Convierte los defaultdict anidados de GridOptionsBuilder en dicts serializables."""
+    if isinstance(value, dict):
+        return {key: _to_plain_options(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_plain_options(item) for item in value]
+    return value
+
+
+@st.cache_data(show_spinner=False)
+def _cached_forecast_grid_options(columns: tuple, dtypes: tuple, group_by_bu: bool,
+                                  highlight_columns: tuple, paginate: bool,
+                                  _schema: pd.DataFrame) -> Dict:
+    """Construye gridOptions de forecast; la key de caché es el esquema (columns, dtypes)."""
+    gb = AGGridConfigurator.configure_forecast_table(_schema, group_by_bu=group_by_bu)
+    if highlight_columns:
+        # El resaltado también es un tipo de columna: el JS se envía una sola vez
+        gb.configure_grid_options(columnTypes={
+            **AGGridConfigurator.get_currency_column_types(),
+            'costHighlightColumn': {'cellStyle': AGGridConfigurator.get_cost_highlight_style()}
+        })
+        for column in highlight_columns:
+            gb.configure_column(column, type=["numericColumn", "currencyMonthColumn", "costHighlightColumn"])
+    if paginate:
+        gb.configure_pagination(
+            paginationAutoPageSize=False,
+            paginationPageSize=AGGridConfigurator.PAGINATION_PAGE_SIZE
+        )
+    return _to_plain_options(gb.build())
+
+
 class AGGridExporter:
     """Utilidades para exportar datos desde AG-Grid."""
     
@@ -346,7 +444,11 @@ GRID_CONFIGS = {
         'height': 500,
         'enable_enterprise_modules': False,
         'allow_unsafe_jscode': True,
-        'update_mode': 'MODEL_CHANGED',
+        'update_mode': 'NO_UPDATE',
+        # Solo lectura: ningún evento de la grid (ordenar, filtrar, seleccionar)
+        # provoca un rerun. NO_UPDATE por sí solo no basta: st_aggrid suma sus
+        # eventos a update_on, cuyo valor por defecto incluye filterChanged/sortChanged
+        'update_on': [],
         'fit_columns_on_grid_load': True
     },
     'details': {
@@ -15,6 +15,9 @@ import streamlit as st
 
 logger = logging.getLogger(__name__)
 
+# Columnas de texto de la tabla de forecast: el resto son montos por mes
+_FORECAST_TEXT_COLUMNS = frozenset(['Proyecto', 'BU', 'Empresa'])
+
 
 class ForecastChatbot:
     """
@@ -296,7 +299,7 @@ class ForecastChatbot:
             df = df[df['BU'] == bu.upper()]
         
         # Calcular total por proyecto
-        numeric_cols = [col for col in df.columns if col not in ['Proyecto', 'BU', 'Empresa']]
+        numeric_cols = [col for col in df.columns if col not in _FORECAST_TEXT_COLUMNS]
         df['Total'] = df[numeric_cols].sum(axis=1)
         
         # Ordenar y limitar
@@ -322,7 +325,7 @@ class ForecastChatbot:
         if df.empty or 'Empresa' not in df.columns:
             return "No hay datos de empresa disponibles."
         
-        numeric_cols = [col for col in df.columns if col not in ['Proyecto', 'BU', 'Empresa']]
+        numeric_cols = [col for col in df.columns if col not in _FORECAST_TEXT_COLUMNS]
         df['Total'] = df[numeric_cols].sum(axis=1)
         
         company_totals = df.groupby('Empresa')['Total'].sum().sort_values(ascending=False)
@@ -391,7 +394,7 @@ class ForecastChatbot:
         if results.empty:
             return f"No se encontraron proyectos que coincidan con '{query}'."
         
-        numeric_cols = [col for col in df.columns if col not in ['Proyecto', 'BU', 'Empresa']]
+        numeric_cols = [col for col in df.columns if col not in _FORECAST_TEXT_COLUMNS]
         results['Total'] = results[numeric_cols].sum(axis=1)
         
         result = f"🔍 RESULTADOS DE BÚSQUEDA: '{query}'\n"
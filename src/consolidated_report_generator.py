@@ -3,17 +3,87 @@ Generador de reportes consolidados usando el template.
 Llena el template con datos de Forecast, Costo de Venta y KPIs PM-008.
 """
 
+import numpy as np
 import pandas as pd
 import openpyxl
 from openpyxl.styles import numbers
 from datetime import datetime
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 import logging
 from io import BytesIO
 import calendar
 
 logger = logging.getLogger(__name__)
 
+# Agrupaciones de BUs del template: TESTING incluye ICT, FCT y OTROS incluye TRN, SWD
+# (REP es BU individual, no forma parte de OTROS)
+_BU_GROUPS = {
+    'TESTING': ('ICT', 'FCT'),
+    'OTROS': ('TRN', 'SWD'),
+}
+
+# Formatos aceptados para las etiquetas de mes ("November 2025", "Nov 2025", ...)
+_MONTH_FORMATS = ('%B %Y', '%b %Y', '%B %y', '%b %y')
+
+# Tablas de forecast que alimentan el reporte
+_FORECAST_SOURCES = ('forecast_table', 'forecast_table_low_prob', 'cost_of_sale_table', 'cost_of_sale_table_low_prob')
+
+# Columnas de la tabla de KPIs que no son meses (búsqueda O(1) por columna)
+KPI_NON_MONTH_COLUMNS = frozenset(['Proyecto', 'BU', 'Location', 'Status', 'Customer', 'Total PO', '% Facturación', 'Costo de Venta'])
+
+# Secciones de cada BU en el template, en orden de filas (una fila por Location):
+# (fuente de datos, columna con la Location)
+_SECTIONS = (
+    ('kpi_billing', 'Location'),                   # 1. Facturación por Backlog PM (KPIs)
+    ('kpi_cost', 'Location'),                      # 2. Costo de venta por Backlog PM (KPIs)
+    ('forecast_table', 'Empresa'),                 # 3. Facturación por Forecast >= 60%
+    ('forecast_table_low_prob', 'Empresa'),        # 4. Facturación por Forecast < 60%
+    ('cost_of_sale_table', 'Empresa'),             # 5. Costo de venta por Forecast >= 60%
+    ('cost_of_sale_table_low_prob', 'Empresa'),    # 6. Costo de venta por Forecast < 60%
+)
+
+
+@lru_cache(maxsize=None)
+def _parse_month(month_str: str) -> datetime:
+    """
+    Convierte un string de mes a datetime. Memorizado: las etiquetas de mes se
+    repiten en cada reporte y strptime prueba varios formatos con excepciones.
+    
+    Args:
+        month_str: String con formato "Month YYYY" o "Mon YYYY"
+        
+    Returns:
+        datetime object (2099-12-31 si no se puede parsear)
+    """
+    for fmt in _MONTH_FORMATS:
+        try:
+            return datetime.strptime(month_str, fmt)
+        except ValueError:
+            continue
+    
+    # Si no se puede parsear, retornar fecha muy lejana
+    return datetime(2099, 12, 31)
+
+
+def last_positive_month_idx(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Índice de la última columna (mes) con valor > 0 de cada fila, vectorizado:
+    argmax sobre la máscara invertida en lugar de recorrer los meses por fila.
+    
+    Args:
+        values: Matriz (filas x meses); los NaN cuentan como sin facturación
+        
+    Returns:
+        Tupla (índices, filas_validas): índice del último mes con valor > 0 y
+        máscara de las filas que tienen al menos un mes con valor > 0
+    """
+    positive = values > 0
+    if positive.shape[1] == 0:
+        return np.zeros(len(positive), dtype=np.intp), np.zeros(len(positive), dtype=bool)
+    last_idx = positive.shape[1] - 1 - positive[:, ::-1].argmax(axis=1)
+    return last_idx, positive.any(axis=1)
+
 
 class ConsolidatedReportGenerator:
     """Genera reportes consolidados llenando el template con datos procesados."""
@@ -30,6 +100,8 @@ class ConsolidatedReportGenerator:
         # REP se incluye como BU individual (no forma parte de OTROS)
         self.bus = ['TODAS', 'TESTING', 'ICT', 'FCT', 'IAT', 'REP', 'OTROS']
         self.locations = ['SAPI', 'LLC']
+        # Fecha de cada mes de los datos, calculada al extraer los meses
+        self._month_dates = {}
     
     def generate_report(
         self,
@@ -52,8 +124,11 @@ class ConsolidatedReportGenerator:
         wb = openpyxl.load_workbook(self.template_path)
         ws = wb['Hoja2']
         
+        # DataFrames de cada fuente, construidos una sola vez para todo el reporte
+        frames = self._build_source_frames(forecast_results, kpi_results)
+        
         # Extraer meses únicos de los datos fuente
-        months = self._extract_months_from_data(forecast_results, kpi_results)
+        months = self._extract_months_from_data(frames, kpi_results)
         
         if not months:
             logger.warning("No se encontraron meses en los datos")
@@ -64,51 +139,28 @@ class ConsolidatedReportGenerator:
         # Escribir headers de meses en la fila 1
         self._write_month_headers(ws, months)
         
-        # Llenar datos por cada BU
+        # Totales por mes de cada grupo (Location, BU) de cada fuente, con una sola
+        # agregación por fuente: cada fila del template suma los grupos que le tocan
+        group_totals = {}
+        for source, location_col in _SECTIONS:
+            if source in frames:
+                group_totals[source] = self._group_month_totals(frames[source], location_col, months)
+        
+        # Llenar datos por cada BU: una fila por sección y Location, en el orden del template
         current_row = 2  # Empezar desde la fila 2
         
         for bu in self.bus:
             logger.info(f"Procesando BU: {bu}")
             
-            # 1. Facturación por Backlog PM (KPIs)
-            self._fill_kpi_billing(ws, current_row, 'SAPI', bu, months, kpi_results)
-            current_row += 1
-            self._fill_kpi_billing(ws, current_row, 'LLC', bu, months, kpi_results)
-            current_row += 1
-            
-            # 2. Costo de venta por Backlog PM (KPIs)
-            self._fill_kpi_cost(ws, current_row, 'SAPI', bu, months, kpi_results)
-            current_row += 1
-            self._fill_kpi_cost(ws, current_row, 'LLC', bu, months, kpi_results)
-            current_row += 1
-            
-            # 3. Facturación por Forecast >= 60%
-            self._fill_forecast_billing(ws, current_row, 'SAPI', bu, months, forecast_results, low_prob=False)
-            current_row += 1
-            self._fill_forecast_billing(ws, current_row, 'LLC', bu, months, forecast_results, low_prob=False)
-            current_row += 1
-            
-            # 4. Facturación por Forecast < 60%
-            self._fill_forecast_billing(ws, current_row, 'SAPI', bu, months, forecast_results, low_prob=True)
-            current_row += 1
-            self._fill_forecast_billing(ws, current_row, 'LLC', bu, months, forecast_results, low_prob=True)
-            current_row += 1
-            
-            # 5. Costo de venta por Forecast >= 60%
-            self._fill_forecast_cost(ws, current_row, 'SAPI', bu, months, forecast_results, low_prob=False)
-            current_row += 1
-            self._fill_forecast_cost(ws, current_row, 'LLC', bu, months, forecast_results, low_prob=False)
-            current_row += 1
-            
-            # 6. Costo de venta por Forecast < 60%
-            self._fill_forecast_cost(ws, current_row, 'SAPI', bu, months, forecast_results, low_prob=True)
-            current_row += 1
-            self._fill_forecast_cost(ws, current_row, 'LLC', bu, months, forecast_results, low_prob=True)
-            current_row += 1
-        
-        # Aplicar formato de moneda a las celdas de datos (columnas dinámicas según cantidad de meses)
-        end_col = 3 + len(months)  # Columna D (4) es la primera, entonces 3 + cantidad de meses
-        self._apply_currency_format(ws, start_row=2, end_row=current_row-1, start_col=4, end_col=end_col)
+            for source, _ in _SECTIONS:
+                totals = group_totals.get(source)
+                for location in self.locations:
+                    if totals is not None:
+                        # Solo existen grupos con filas: sin grupos seleccionados no hay datos
+                        selected = self._location_bu_selection(totals.index, location, bu)
+                        if selected.any():
+                            self._fill_monthly_data(ws, current_row, totals.to_numpy()[selected].sum(axis=0))
+                    current_row += 1
         
         # Guardar en BytesIO
         buffer = BytesIO()
@@ -118,76 +170,35 @@ class ConsolidatedReportGenerator:
         logger.info("Reporte consolidado generado exitosamente")
         return buffer
     
-    def _extract_months_from_data(self, forecast_results: Optional[Dict], kpi_results: Optional[Dict]) -> list:
+    def _extract_months_from_data(self, frames: Dict[str, pd.DataFrame], kpi_results: Optional[Dict]) -> list:
         """
         Extrae todos los meses únicos de los datos fuente.
         
         Args:
-            forecast_results: Resultados de forecast
+            frames: DataFrames de las fuentes del reporte (ver _build_source_frames)
             kpi_results: Resultados de KPIs
             
         Returns:
             Lista de strings con nombres de meses ordenados cronológicamente
         """
-        month_set = set()
-        
-        # Extraer de forecast_table
-        if forecast_results and 'forecast_table' in forecast_results:
-            df = forecast_results['forecast_table'].get('data', [])
-            if df:
-                df = pd.DataFrame(df)
-                # Buscar columnas que parecen meses (formato "Month YYYY")
-                for col in df.columns:
-                    if self._is_month_column(col):
-                        month_set.add(str(col))
-        
-        # Extraer de forecast_table_low_prob
-        if forecast_results and 'forecast_table_low_prob' in forecast_results:
-            df = forecast_results['forecast_table_low_prob'].get('data', [])
-            if df:
-                df = pd.DataFrame(df)
-                for col in df.columns:
-                    if self._is_month_column(col):
-                        month_set.add(str(col))
-        
-        # Extraer de cost_of_sale_table
-        if forecast_results and 'cost_of_sale_table' in forecast_results:
-            df = forecast_results['cost_of_sale_table'].get('data', [])
-            if df:
-                df = pd.DataFrame(df)
-                for col in df.columns:
-                    if self._is_month_column(col):
-                        month_set.add(str(col))
-        
-        # Extraer de cost_of_sale_table_low_prob
-        if forecast_results and 'cost_of_sale_table_low_prob' in forecast_results:
-            df = forecast_results['cost_of_sale_table_low_prob'].get('data', [])
-            if df:
-                df = pd.DataFrame(df)
-                for col in df.columns:
-                    if self._is_month_column(col):
-                        month_set.add(str(col))
-        
-        # Extraer de billing_table (KPIs)
-        if kpi_results and 'billing_table' in kpi_results:
-            df = kpi_results['billing_table'].get('data', [])
-            if df:
-                df = pd.DataFrame(df)
-                for col in df.columns:
-                    if self._is_month_column(col):
-                        month_set.add(str(col))
-        
-        # Extraer de cost_table (KPIs)
-        if kpi_results and 'cost_table' in kpi_results:
-            df = kpi_results['cost_table'].get('data', [])
-            if df:
-                df = pd.DataFrame(df)
-                for col in df.columns:
-                    if self._is_month_column(col):
-                        month_set.add(str(col))
-        
-        # Convertir a lista y ordenar cronológicamente
-        months_list = sorted(list(month_set), key=self._parse_month_string)
+        # Columnas de las tablas de forecast, ya construidas para llenar el reporte
+        column_sets = [frames[source].columns for source in _FORECAST_SOURCES if source in frames]
+        
+        # Tablas de KPIs (billing_table / cost_table), si vienen en los resultados
+        if kpi_results:
+            for table_key in ('billing_table', 'cost_table'):
+                if table_key in kpi_results:
+                    data = kpi_results[table_key].get('data', [])
+                    if data:
+                        column_sets.append(pd.DataFrame(data).columns)
+        
+        # Buscar columnas que parecen meses (formato "Month YYYY")
+        month_set = {str(col) for columns in column_sets for col in columns if self._is_month_column(col)}
+        
+        # Parsear cada mes una sola vez: la misma fecha sirve para ordenar y
+        # para escribir los encabezados
+        self._month_dates = {month: self._parse_month_string(month) for month in month_set}
+        months_list = sorted(month_set, key=self._month_dates.__getitem__)
         
         return months_list
     
@@ -226,16 +237,7 @@ class ConsolidatedReportGenerator:
         Returns:
             datetime object
         """
-        formats = ['%B %Y', '%b %Y', '%B %y', '%b %y']
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(month_str, fmt)
-            except:
-                continue
-        
-        # Si no se puede parsear, retornar fecha muy lejana
-        return datetime(2099, 12, 31)
+        return _parse_month(month_str)
     
     def _write_month_headers(self, ws, months: list):
         """
@@ -250,239 +252,145 @@ class ConsolidatedReportGenerator:
         ws.cell(row=1, column=2, value='Location')
         ws.cell(row=1, column=3, value='BU')
         
-        # Escribir meses desde columna D (4) en adelante
+        # Escribir meses desde columna D (4) en adelante (fechas ya parseadas al extraer los meses)
         for idx, month_str in enumerate(months, start=4):
-            # Convertir a datetime para formato consistente
-            month_date = self._parse_month_string(month_str)
-            ws.cell(row=1, column=idx, value=month_date)
+            ws.cell(row=1, column=idx, value=self._month_dates[month_str])
     
-    def _fill_kpi_billing(self, ws, row: int, location: str, bu: str, months: list, kpi_results: Optional[Dict]):
-        """Llena datos de facturación por KPIs PM-008."""
-        if not kpi_results or 'data' not in kpi_results:
-            logger.debug(f"No hay datos de KPIs disponibles para billing (Location: {location}, BU: {bu})")
-            return
-        
-        df_data = kpi_results.get('data', [])
-        if not df_data:
-            logger.debug(f"Lista de datos KPIs vacía (Location: {location}, BU: {bu})")
-            return
-        
-        df = pd.DataFrame(df_data)
-        logger.debug(f"KPI Billing - Location: {location}, BU: {bu}, Registros totales: {len(df)}")
-        
-        # Filtrar por Location y BU
-        if bu == 'TODAS':
-            filtered = df[df['Location'] == location]
-        elif bu == 'TESTING':
-            # TESTING incluye ICT, FCT
-            testing_bus = ['ICT', 'FCT']
-            filtered = df[(df['Location'] == location) & (df['BU'].isin(testing_bus))]
-        elif bu == 'OTROS':
-            # OTROS incluye TRN, SWD (REP es BU individual)
-            otros_bus = ['TRN', 'SWD']
-            filtered = df[(df['Location'] == location) & (df['BU'].isin(otros_bus))]
+    def _build_source_frames(self, forecast_results: Optional[Dict], kpi_results: Optional[Dict]) -> Dict[str, pd.DataFrame]:
+        """
+        Construye el DataFrame de cada fuente del reporte una sola vez. Para KPIs
+        y para las tablas de forecast se reutiliza el DataFrame que la app ya
+        guardó junto a 'data' (clave 'df').
+        
+        Args:
+            forecast_results: Resultados de forecast
+            kpi_results: Resultados de KPIs
+            
+        Returns:
+            Dict {fuente: DataFrame}; las fuentes sin datos no se incluyen
+        """
+        frames = {}
+        
+        if kpi_results and kpi_results.get('data'):
+            df_kpi = kpi_results.get('df')
+            if df_kpi is None:
+                df_kpi = pd.DataFrame(kpi_results['data'])
+            frames['kpi_billing'] = df_kpi
+            # El costo de KPIs se asigna al último mes con facturación (igual que en app.py)
+            frames['kpi_cost'] = self._generate_kpi_cost_table(df_kpi)
         else:
-            filtered = df[(df['Location'] == location) & (df['BU'] == bu)]
+            logger.debug("No hay datos de KPIs disponibles")
+        
+        if forecast_results:
+            for source in _FORECAST_SOURCES:
+                table = forecast_results.get(source)
+                if table and table.get('data'):
+                    df_table = table.get('df')
+                    if df_table is None:
+                        df_table = pd.DataFrame(table['data'])
+                    frames[source] = df_table
+        
+        logger.debug(f"Fuentes con datos: {list(frames)}")
+        return frames
+    
+    def _group_month_totals(self, df: pd.DataFrame, location_col: str, months: list) -> pd.DataFrame:
+        """
+        Suma los meses de una fuente por grupo (Location, BU).
         
-        logger.debug(f"KPI Billing filtrados - Location: {location}, BU: {bu}, Registros: {len(filtered)}")
+        Args:
+            df: DataFrame de la fuente
+            location_col: Columna con la Location ('Location' o 'Empresa')
+            months: Lista de strings con nombres de meses exactos de las columnas
+            
+        Returns:
+            DataFrame indexado por (Location, BU) con una columna por mes; solo
+            incluye los grupos que tienen filas
+        """
+        values = pd.DataFrame(self._month_matrix(df, months), index=df.index)
+        return values.groupby([df[location_col], df['BU']], observed=True, dropna=False).sum()
+    
+    @staticmethod
+    def _location_bu_selection(group_index: pd.MultiIndex, location: str, bu: str) -> np.ndarray:
+        """
+        Selecciona los grupos (Location, BU) de una Location y una BU del template.
         
-        # Sumar por mes
-        self._fill_monthly_data(ws, row, filtered, months)
+        Args:
+            group_index: Índice (Location, BU) de los totales por grupo
+            location: 'SAPI' o 'LLC'
+            bu: BU del template ('TODAS', una BU o una agrupación)
+            
+        Returns:
+            Array booleano con una posición por grupo
+        """
+        group_bus = group_index.get_level_values(1)
+        selected = np.asarray(group_index.get_level_values(0) == location)
+        if bu in _BU_GROUPS:
+            selected &= np.asarray(group_bus.isin(_BU_GROUPS[bu]))
+        elif bu != 'TODAS':
+            selected &= np.asarray(group_bus == bu)
+        return selected
     
-    def _generate_kpi_cost_table(self, df_billing: pd.DataFrame, months: list) -> pd.DataFrame:
+    def _generate_kpi_cost_table(self, df_billing: pd.DataFrame) -> pd.DataFrame:
         """
         Genera tabla de costo de venta a partir de la tabla de billing de KPIs.
         El costo se asigna al último mes con facturación.
         
         Args:
             df_billing: DataFrame con datos de billing
-            months: Lista de meses
             
         Returns:
             DataFrame con tabla de costo
         """
         # Identificar columnas de meses en el DataFrame original
-        month_cols = [col for col in df_billing.columns 
-                     if col not in ['Proyecto', 'BU', 'Location', 'Status', 'Customer', 'Total PO', '% Facturación', 'Costo de Venta']]
+        month_cols = [col for col in df_billing.columns if col not in KPI_NON_MONTH_COLUMNS]
         
         # Crear tabla base con información del proyecto
         df_cost = df_billing[['Proyecto', 'BU', 'Location', 'Status', 'Customer', 'Costo de Venta']].copy()
+        if not month_cols:
+            return df_cost
         
-        # Inicializar columnas de meses con 0
-        for month in month_cols:
-            df_cost[month] = 0
+        # Último mes con facturación por proyecto en una sola pasada vectorizada
+        month_values = df_billing[month_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        last_month_idx, has_billing = last_positive_month_idx(month_values)
         
-        # Para cada proyecto, encontrar el último mes con facturación y asignar el costo ahí
-        for idx in df_billing.index:
-            last_month_with_billing = None
-            
-            # Buscar último mes con valor > 0
-            for month in month_cols:
-                if pd.notna(df_billing.loc[idx, month]) and df_billing.loc[idx, month] > 0:
-                    last_month_with_billing = month
-            
-            # Si encontramos un mes con facturación, asignar el costo total ahí
-            if last_month_with_billing and pd.notna(df_billing.loc[idx, 'Costo de Venta']):
-                df_cost.loc[idx, last_month_with_billing] = df_billing.loc[idx, 'Costo de Venta']
+        # Asignar el costo total en ese mes (solo proyectos con facturación y costo definido)
+        costs = pd.to_numeric(df_billing['Costo de Venta'], errors='coerce').to_numpy()
+        rows = np.flatnonzero(has_billing & ~np.isnan(costs))
+        cost_matrix = np.zeros(month_values.shape)
+        cost_matrix[rows, last_month_idx[rows]] = costs[rows]
+        df_cost[month_cols] = cost_matrix
         
         return df_cost
     
-    def _fill_kpi_cost(self, ws, row: int, location: str, bu: str, months: list, kpi_results: Optional[Dict]):
-        """Llena datos de costo de venta por KPIs PM-008."""
-        if not kpi_results or 'data' not in kpi_results:
-            logger.debug(f"No hay datos de KPIs disponibles para costo (Location: {location}, BU: {bu})")
-            return
-        
-        df_data = kpi_results.get('data', [])
-        if not df_data:
-            logger.debug(f"Lista de datos KPIs vacía para costo (Location: {location}, BU: {bu})")
-            return
-        
-        df_billing = pd.DataFrame(df_data)
-        logger.debug(f"KPI Cost - Location: {location}, BU: {bu}, Registros billing: {len(df_billing)}")
-        
-        # Generar tabla de costo (igual que en app.py)
-        df_cost = self._generate_kpi_cost_table(df_billing, months)
-        logger.debug(f"Tabla de costo generada con {len(df_cost)} registros")
-        
-        # Filtrar por Location y BU
-        if bu == 'TODAS':
-            filtered = df_cost[df_cost['Location'] == location]
-        elif bu == 'TESTING':
-            # TESTING incluye ICT, FCT
-            testing_bus = ['ICT', 'FCT']
-            filtered = df_cost[(df_cost['Location'] == location) & (df_cost['BU'].isin(testing_bus))]
-        elif bu == 'OTROS':
-            # OTROS incluye TRN, SWD (REP es BU individual)
-            otros_bus = ['TRN', 'SWD']
-            filtered = df_cost[(df_cost['Location'] == location) & (df_cost['BU'].isin(otros_bus))]
-        else:
-            filtered = df_cost[(df_cost['Location'] == location) & (df_cost['BU'] == bu)]
-        
-        logger.debug(f"KPI Cost filtrados - Location: {location}, BU: {bu}, Registros: {len(filtered)}")
-        
-        # Sumar por mes
-        self._fill_monthly_data(ws, row, filtered, months)
-    
-    def _fill_forecast_billing(self, ws, row: int, location: str, bu: str, months: list, 
-                               forecast_results: Optional[Dict], low_prob: bool = False):
-        """Llena datos de facturación por Forecast."""
-        if not forecast_results:
-            return
-        
-        # Seleccionar la tabla correcta
-        if low_prob:
-            table_key = 'forecast_table_low_prob'
-        else:
-            table_key = 'forecast_table'
-        
-        if table_key not in forecast_results:
-            return
-        
-        df = forecast_results[table_key].get('data', [])
-        if not df:
-            return
-        
-        df = pd.DataFrame(df)
-        
-        # Filtrar por Empresa (Location) y BU
-        if bu == 'TODAS':
-            filtered = df[df['Empresa'] == location]
-        elif bu == 'TESTING':
-            # TESTING incluye ICT, FCT
-            testing_bus = ['ICT', 'FCT']
-            filtered = df[(df['Empresa'] == location) & (df['BU'].isin(testing_bus))]
-        elif bu == 'OTROS':
-            # OTROS incluye TRN, SWD (REP es BU individual)
-            otros_bus = ['TRN', 'SWD']
-            filtered = df[(df['Empresa'] == location) & (df['BU'].isin(otros_bus))]
-        else:
-            filtered = df[(df['Empresa'] == location) & (df['BU'] == bu)]
-        
-        # Sumar por mes
-        self._fill_monthly_data(ws, row, filtered, months)
-    
-    def _fill_forecast_cost(self, ws, row: int, location: str, bu: str, months: list,
-                           forecast_results: Optional[Dict], low_prob: bool = False):
-        """Llena datos de costo de venta por Forecast."""
-        if not forecast_results:
-            return
-        
-        # Seleccionar la tabla correcta
-        if low_prob:
-            table_key = 'cost_of_sale_table_low_prob'
-        else:
-            table_key = 'cost_of_sale_table'
-        
-        if table_key not in forecast_results:
-            return
-        
-        df = forecast_results[table_key].get('data', [])
-        if not df:
-            return
-        
-        df = pd.DataFrame(df)
-        
-        # Filtrar por Empresa (Location) y BU
-        if bu == 'TODAS':
-            filtered = df[df['Empresa'] == location]
-        elif bu == 'TESTING':
-            # TESTING incluye ICT, FCT
-            testing_bus = ['ICT', 'FCT']
-            filtered = df[(df['Empresa'] == location) & (df['BU'].isin(testing_bus))]
-        elif bu == 'OTROS':
-            # OTROS incluye TRN, SWD (REP es BU individual)
-            otros_bus = ['TRN', 'SWD']
-            filtered = df[(df['Empresa'] == location) & (df['BU'].isin(otros_bus))]
-        else:
-            filtered = df[(df['Empresa'] == location) & (df['BU'] == bu)]
-        
-        # Sumar por mes
-        self._fill_monthly_data(ws, row, filtered, months)
-    
-    def _fill_monthly_data(self, ws, row: int, filtered_df: pd.DataFrame, months: list):
+    @staticmethod
+    def _month_matrix(df: pd.DataFrame, months: list) -> np.ndarray:
         """
-        Llena los datos mensuales en la fila especificada.
+        Matriz float64 (filas x meses) de una fuente, alineada con los meses del
+        reporte. Los meses que la fuente no tiene y los valores no numéricos
+        quedan como NaN.
         
         Args:
-            ws: Worksheet de openpyxl
-            row: Fila donde llenar datos
-            filtered_df: DataFrame filtrado con los datos
+            df: DataFrame de la fuente
             months: Lista de strings con nombres de meses exactos de las columnas
-        """
-        if filtered_df.empty:
-            return
-        
-        # Columna inicial (D = 4)
-        col_idx = 4
-        
-        for month_str in months:
-            # Buscar columna exacta en el dataframe
-            total = 0
-            if month_str in filtered_df.columns:
-                # Sumar valores de esa columna (excluyendo filas de totales)
-                values = pd.to_numeric(filtered_df[month_str], errors='coerce').fillna(0)
-                total = values.sum()
             
-            # Escribir el valor en la celda
-            ws.cell(row=row, column=col_idx, value=float(total) if total != 0 else None)
-            col_idx += 1
+        Returns:
+            Matriz de forma (filas, meses)
+        """
+        return df.reindex(columns=months).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
     
-    def _apply_currency_format(self, ws, start_row: int, end_row: int, start_col: int, end_col: int):
+    def _fill_monthly_data(self, ws, row: int, totals: np.ndarray):
         """
-        Aplica formato de moneda a un rango de celdas.
+        Llena los datos mensuales en la fila especificada.
         
         Args:
-            ws: Worksheet
-            start_row: Fila inicial
-            end_row: Fila final
-            start_col: Columna inicial
-            end_col: Columna final
+            ws: Worksheet de openpyxl
+            row: Fila donde llenar datos
+            totals: Total de cada mes, en el orden de las columnas del reporte
         """
-        currency_format = '$#,##0.00'
-        
-        for row_idx in range(start_row, end_row + 1):
-            for col_idx in range(start_col, end_col + 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                if cell.value is not None:
-                    cell.number_format = currency_format
+        # Columna inicial (D = 4)
+        for col_idx, total in enumerate(totals, start=4):
+            # Escribir el valor en la celda; el formato de moneda se asigna al escribir,
+            # sin recorrer después todo el rango de datos
+            cell = ws.cell(row=row, column=col_idx, value=float(total) if total != 0 else None)
+            if cell.value is not None:
+                cell.number_format = '$#,##0.00'
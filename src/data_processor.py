@@ -29,6 +29,16 @@ class DataProcessor:
     de entrada para prepararlos para el cálculo del forecast.
     """
     
+    # Columnas de los datos limpios que se copian a cada Opportunity
+    OPPORTUNITY_COLUMNS = (
+        'Opportunity Name', 'BU', 'Amount', 'close_date_parsed', 'Lead Time',
+        'probability_assigned', 'Paid in Advance', 'Payment Terms', 'region_detected',
+        'Company', 'Gross Margin', 'Account Name', 'invoice_date_parsed', 'sat_date_parsed'
+    )
+    
+    # Columnas de texto de baja cardinalidad que se guardan como categóricas
+    CATEGORICAL_COLUMNS = ('BU', 'Company', 'Payment Terms', 'Stage')
+    
     def __init__(self):
         """Inicializa el procesador con configuraciones por defecto."""
         self.header_row = EXCEL_CONFIG.HEADER_ROW
@@ -90,7 +100,11 @@ class DataProcessor:
         """
         logger.info("Iniciando limpieza de datos")
         
-        df_clean = df.copy()
+        # Copias superficiales en cada etapa: las etapas reasignan columnas completas
+        # (nunca escriben sobre los datos del DataFrame recibido), así que no hace
+        # falta duplicar toda la tabla en cada paso. _complete_missing_data, que
+        # escribe celda por celda, sí trabaja sobre una copia completa.
+        df_clean = df.copy(deep=False)
         
         # Limpiar columna BU de símbolos especiales
         df_clean = self._clean_bu_column(df_clean)
@@ -119,6 +133,12 @@ class DataProcessor:
         # Actualizar base de datos histórica con nuevos datos
         self.client_db.add_historical_data(df_clean)
         
+        # Columnas repetitivas como categóricas: menos memoria y unique()/value_counts
+        # en O(categorías) en validaciones y resúmenes
+        for column in self.CATEGORICAL_COLUMNS:
+            if column in df_clean.columns:
+                df_clean[column] = df_clean[column].astype('category')
+        
         logger.info(f"Datos limpiados: {len(df_clean)} registros válidos")
         return df_clean
     
@@ -135,7 +155,7 @@ class DataProcessor:
         if 'BU' not in df.columns:
             return df
         
-        df = df.copy()
+        df = df.copy(deep=False)  # Solo se reasignan columnas completas
         
         # Remover símbolos especiales comunes: flechas, espacios extra, etc.
         df['BU'] = df['BU'].astype(str).str.replace('↑', '', regex=False)
@@ -168,7 +188,7 @@ class DataProcessor:
         """
         logger.debug("Normalizando columnas de probabilidad y BU (ya procesadas por extract_projects_from_pipeline)")
         
-        df = df.copy()
+        df = df.copy(deep=False)  # Solo se reasignan columnas completas
         
         # Buscar columna de probabilidad (puede tener diferentes nombres)
         prob_col = None
@@ -273,7 +293,7 @@ class DataProcessor:
         """
         logger.debug(f"Ajustando Lead Times al mínimo de {self.min_lead_time} semanas")
         
-        df = df.copy()
+        df = df.copy(deep=False)  # Solo se reasignan columnas completas
         
         # Guardar Lead Time original
         df['lead_time_original'] = df['Lead Time'].copy()
@@ -302,7 +322,7 @@ class DataProcessor:
         """
         logger.debug("Convirtiendo fechas a formato datetime")
         
-        df = df.copy()
+        df = df.copy(deep=False)  # Solo se reasignan columnas completas
         
         # Convertir Close Date
         df['close_date_parsed'] = df['Close Date'].apply(self._parse_date)
@@ -382,7 +402,10 @@ class DataProcessor:
             return None
         
         try:
-            current_date = datetime.now()
+            # Medianoche de hoy: la hora no afecta el cálculo y así reprocesar el
+            # mismo archivo produce exactamente las mismas fechas (y la misma key
+            # de caché del forecast, ver _opportunities_data_key)
+            current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
             
             # Solo ajustar si la fecha es de un MES ANTERIOR (no solo día anterior)
             # Comparar año y mes, no día
@@ -418,7 +441,7 @@ class DataProcessor:
         """
         logger.debug("Limpiando valores numéricos")
         
-        df = df.copy()
+        df = df.copy(deep=False)  # Solo se reasignan columnas completas
         
         # Limpiar Amount
         df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
@@ -458,7 +481,7 @@ class DataProcessor:
         """
         logger.debug("Detectando región y clasificando empresa desde columna Region")
         
-        df = df.copy()
+        df = df.copy(deep=False)  # Solo se reasignan columnas completas
         
         # Detectar región SOLO desde columna Region
         if 'Region' in df.columns:
@@ -656,8 +679,11 @@ class DataProcessor:
         
         opportunities = []
         errors = 0
+        has_account_name = 'Account Name' in df.columns
         
-        for idx, row in df.iterrows():
+        # to_dict('records') materializa cada fila como dict nativo; iterrows construye
+        # una Series por fila, mucho más costosa
+        for idx, row in zip(df.index, df.to_dict('records')):
             try:
                 # Validar que BU no sea NaN antes de crear el objeto
                 bu_value = row['BU']
@@ -679,7 +705,7 @@ class DataProcessor:
                     region=str(row['region_detected']) if pd.notna(row.get('region_detected')) else None,
                     company=str(row['Company']) if pd.notna(row.get('Company')) else None,
                     gross_margin=float(row['Gross Margin']) if pd.notna(row.get('Gross Margin')) and row['Gross Margin'] > 0 else None,
-                    account_name=str(row['Account Name']).strip() if 'Account Name' in df.columns and pd.notna(row.get('Account Name')) else None,
+                    account_name=str(row['Account Name']).strip() if has_account_name and pd.notna(row.get('Account Name')) else None,
                     invoice_date=row.get('invoice_date_parsed') if pd.notna(row.get('invoice_date_parsed')) else None,
                     sat_date=row.get('sat_date_parsed') if pd.notna(row.get('sat_date_parsed')) else None
                 )
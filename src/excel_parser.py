@@ -161,12 +161,20 @@ class ExcelParser:
         """
         logger.info(f"Usando extract_projects_from_pipeline para procesar archivo Excel (hoja: '{sheet_name}')")
         
+        # Abrir el libro una sola vez: las lecturas siguientes (detección de headers,
+        # datos y el método de respaldo) reutilizan el mismo ExcelFile en lugar de
+        # volver a descomprimir y cargar el xlsx completo en cada pd.read_excel
+        with pd.ExcelFile(file_path_or_buffer, engine=EXCEL_CONFIG.READ_ENGINE) as excel_file:
+            return self._detect_header_row_from_workbook(excel_file, max_rows, sheet_name)
+    
+    def _detect_header_row_from_workbook(self, excel_file: pd.ExcelFile, max_rows: int, sheet_name: str) -> Tuple[int, pd.DataFrame]:
+        """Detección de headers sobre un libro ya abierto (ver detect_header_row)."""
         try:
             # Importar el método desde extract_projects
             from .extract_projects import extract_projects_from_pipeline
             
             # Usar el método que ya implementa toda la lógica necesaria
-            df_processed = extract_projects_from_pipeline(file_path_or_buffer, sheet_name=sheet_name)
+            df_processed = extract_projects_from_pipeline(excel_file, sheet_name=sheet_name)
             
             # El método ya:
             # 1. Detecta automáticamente los headers
@@ -184,7 +192,7 @@ class ExcelParser:
             
             # Fallback al método original si falla
             logger.warning("Usando método de detección original como fallback")
-            return self._detect_header_row_original(file_path_or_buffer, max_rows, sheet_name)
+            return self._detect_header_row_original(excel_file, max_rows, sheet_name)
     
     def _detect_header_row_original(self, file_path_or_buffer, max_rows: int = 20, sheet_name: str = 0) -> Tuple[int, pd.DataFrame]:
         """
@@ -6,6 +6,9 @@ como Excel, CSV y PDF para facilitar el análisis y distribución.
 """
 
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from datetime import datetime
 from typing import List, Dict
 import io
@@ -19,6 +22,32 @@ from config.settings import ERROR_MESSAGES, INFO_MESSAGES
 logger = logging.getLogger(__name__)
 
 
+def dataframe_to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """
+    Serializa un DataFrame a CSV (UTF-8) con el escritor nativo de PyArrow.
+    
+    Si alguna columna tiene tipos mezclados que Arrow no puede convertir
+    (p. ej. montos con 'TBD'), se usa el escritor de pandas.
+    
+    Args:
+        df: DataFrame a exportar
+        
+    Returns:
+        bytes: Contenido CSV
+    """
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Escribir por bloques directamente a bytes, sin construir un str intermedio
+        buffer = io.BytesIO()
+        df.to_csv(buffer, index=False, encoding='utf-8', chunksize=10000)
+        return buffer.getvalue()
+    
+    buffer = pa.BufferOutputStream()
+    pa_csv.write_csv(table, buffer)
+    return buffer.getvalue().to_pybytes()
+
+
 class ForecastExporter:
     """
     Clase para exportar resultados del forecast a diferentes formatos.
@@ -56,7 +85,10 @@ class ForecastExporter:
             # Crear buffer en memoria
             buffer = io.BytesIO()
             
-            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+            # xlsxwriter escribe en streaming sobre el buffer y es bastante más rápido
+            # que openpyxl. No se usa constant_memory: pandas escribe las celdas por
+            # columnas y ese modo descarta las filas ya escritas.
+            with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
                 
                 # Hoja 1: Forecast (tabla pivot)
                 forecast_df = pd.DataFrame(forecast_table['data'])
@@ -93,19 +125,22 @@ class ForecastExporter:
                 summary_data.to_excel(writer, sheet_name='Resumen_Ejecutivo', index=False)
                 
                 # Hoja 4: Distribución mensual
-                monthly_df = pd.DataFrame([
-                    {'Mes': month, 'Monto': round(amount, 2)}
-                    for month, amount in summary.monthly_distribution.items()
-                ])
-                if not monthly_df.empty:
+                if summary.monthly_distribution:
+                    monthly_amounts = np.fromiter(summary.monthly_distribution.values(), dtype=np.float64)
+                    monthly_df = pd.DataFrame({
+                        'Mes': list(summary.monthly_distribution),
+                        'Monto': monthly_amounts.round(2)
+                    })
                     monthly_df.to_excel(writer, sheet_name='Distribucion_Mensual', index=False)
                 
-                # Hoja 5: Distribución por BU
-                bu_df = pd.DataFrame([
-                    {'BU': bu, 'Monto': round(amount, 2), 'Porcentaje': round(amount/summary.total_amount*100, 1)}
-                    for bu, amount in summary.bu_distribution.items()
-                ])
-                if not bu_df.empty:
+                # Hoja 5: Distribución por BU (un solo cálculo vectorizado de montos y porcentajes)
+                if summary.bu_distribution:
+                    bu_amounts = np.fromiter(summary.bu_distribution.values(), dtype=np.float64)
+                    bu_df = pd.DataFrame({
+                        'BU': list(summary.bu_distribution),
+                        'Monto': bu_amounts.round(2),
+                        'Porcentaje': (bu_amounts / summary.total_amount * 100).round(1)
+                    })
                     bu_df.to_excel(writer, sheet_name='Distribucion_BU', index=False)
             
             buffer.seek(0)
@@ -116,7 +151,7 @@ class ForecastExporter:
             logger.error(f"Error en exportación a Excel: {str(e)}")
             raise Exception(ERROR_MESSAGES['export_error'])
     
-    def export_forecast_table_to_csv(self, forecast_table: Dict) -> str:
+    def export_forecast_table_to_csv(self, forecast_table: Dict) -> bytes:
         """
         Exporta solo la tabla de forecast a CSV.
         
@@ -124,26 +159,55 @@ class ForecastExporter:
             forecast_table: Tabla de forecast
             
         Returns:
-            str: Contenido CSV como string
+            bytes: Contenido CSV, o None si no hay datos
         """
         logger.info("Exportando tabla de forecast a CSV")
         
         try:
             df = pd.DataFrame(forecast_table['data'])
             if df.empty:
-                return "No hay datos para exportar"
+                return None
             
             # Formatear números
             numeric_columns = df.select_dtypes(include=['number']).columns
             for col in numeric_columns:
                 df[col] = df[col].round(2)
             
-            return df.to_csv(index=False)
+            return dataframe_to_csv_bytes(df)
             
         except Exception as e:
             logger.error(f"Error en exportación a CSV: {str(e)}")
             raise Exception(ERROR_MESSAGES['export_error'])
     
+    def export_forecast_table_to_parquet(self, forecast_table: Dict) -> bytes:
+        """
+        Exporta solo la tabla de forecast a Parquet (columnar, comprimido con Snappy).
+        
+        Args:
+            forecast_table: Tabla de forecast
+            
+        Returns:
+            bytes: Contenido Parquet, o None si no hay datos
+        """
+        logger.info("Exportando tabla de forecast a Parquet")
+        
+        try:
+            df = pd.DataFrame(forecast_table['data'])
+            if df.empty:
+                return None
+            
+            # Mismo redondeo que la exportación CSV
+            numeric_columns = df.select_dtypes(include=['number']).columns
+            df[numeric_columns] = df[numeric_columns].round(2)
+            
+            buffer = io.BytesIO()
+            df.to_parquet(buffer, engine='pyarrow', compression='snappy', index=False)
+            return buffer.getvalue()
+            
+        except Exception as e:
+            logger.error(f"Error en exportación a Parquet: {str(e)}")
+            raise Exception(ERROR_MESSAGES['export_error'])
+    
     def _create_summary_dataframe(self, summary: ForecastSummary) -> pd.DataFrame:
         """
         Crea un DataFrame con el resumen ejecutivo.
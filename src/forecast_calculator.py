@@ -7,16 +7,22 @@ de ingresos basadas en las reglas específicas por unidad de negocio.
 
 import calendar
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 
+import numpy as np
+import pandas as pd
+
 from .models import Opportunity, BillingEvent, BillingStage, BusinessUnit, ForecastSummary
-from config.settings import BUSINESS_RULES
+from config.settings import BUSINESS_RULES, BusinessRules
 
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
+# BUs con facturación simplificada (1 o 2 eventos); frozenset para búsqueda O(1)
+_SIMPLIFIED_BILLING_BUS = frozenset({BusinessUnit.ICT, BusinessUnit.REP})
+
 
 class ForecastCalculator:
     """
@@ -26,9 +32,14 @@ class ForecastCalculator:
     las proyecciones de facturación por oportunidad.
     """
     
-    def __init__(self):
-        """Inicializa el calculador con las reglas de negocio."""
-        self.rules = BUSINESS_RULES
+    def __init__(self, rules: Optional[BusinessRules] = None):
+        """
+        Inicializa el calculador con las reglas de negocio.
+        
+        Args:
+            rules: Reglas a aplicar; por defecto las reglas globales de configuración
+        """
+        self.rules = rules if rules is not None else BUSINESS_RULES
     
     def calculate_forecast(self, opportunities: List[Opportunity], billing_type: str = "Contable") -> List[BillingEvent]:
         """
@@ -45,13 +56,15 @@ class ForecastCalculator:
         
         all_billing_events = []
         
+        # El modo de facturación no cambia entre oportunidades: resolver el método una vez
+        if billing_type == "Financiera":
+            calculate_billing = self._calculate_financial_billing
+        else:
+            calculate_billing = self._calculate_opportunity_billing
+        
         for opportunity in opportunities:
             try:
-                if billing_type == "Financiera":
-                    events = self._calculate_financial_billing(opportunity)
-                else:
-                    events = self._calculate_opportunity_billing(opportunity)
-                all_billing_events.extend(events)
+                all_billing_events.extend(calculate_billing(opportunity))
                 
             except Exception as e:
                 logger.error(f"Error calculando forecast para '{opportunity.name}': {str(e)}")
@@ -71,18 +84,18 @@ class ForecastCalculator:
             List[BillingEvent]: Un solo evento de facturación al 100% en SAT
         """
         # Determinar fecha SAT según BU
-        if opportunity.bu in [BusinessUnit.ICT, BusinessUnit.REP]:
+        if opportunity.bu in _SIMPLIFIED_BILLING_BUS:
             # Para ICT/REP: usar SAT Date si existe, sino close_date + lead_time
             if opportunity.sat_date:
                 sat_date = opportunity.sat_date
             else:
                 sat_date = self._add_weeks(opportunity.close_date, opportunity.lead_time)
         else:
-            # Para otras BUs: calcular SAT según reglas multi-etapa
-            inicio_date = opportunity.close_date
-            dr_date = self._add_days(inicio_date, self.rules.DR_DAYS_OFFSET)
-            fat_date = self._add_weeks(dr_date, opportunity.lead_time)
-            sat_date = self._add_days(fat_date, self.rules.SAT_DAYS_OFFSET)
+            # Para otras BUs: SAT según reglas multi-etapa (INICIO + DR + lead time + SAT).
+            # Las fechas intermedias no se usan aquí: se suma el desplazamiento total una vez
+            offset = (timedelta(days=self.rules.DR_DAYS_OFFSET + self.rules.SAT_DAYS_OFFSET)
+                      + timedelta(weeks=opportunity.lead_time))
+            sat_date = opportunity.close_date + offset
         
         # Crear un solo evento al 100% del monto en SAT
         event = self._create_billing_event(
@@ -105,7 +118,7 @@ class ForecastCalculator:
             List[BillingEvent]: Eventos de facturación para la oportunidad
         """
         # ICT y REP tienen facturación simplificada (1 o 2 eventos)
-        if opportunity.bu in [BusinessUnit.ICT, BusinessUnit.REP]:
+        if opportunity.bu in _SIMPLIFIED_BILLING_BUS:
             return self._calculate_ict_billing(opportunity)
         else:
             return self._calculate_multi_stage_billing(opportunity)
@@ -396,17 +409,14 @@ class ForecastCalculator:
         dates = [event.date for event in billing_events]
         date_range = (min(dates), max(dates))
         
-        # Distribución por BU
-        bu_distribution = {}
-        for event in billing_events:
-            bu_name = event.bu.value
-            bu_distribution[bu_name] = bu_distribution.get(bu_name, 0) + event.amount_adjusted
-        
-        # Distribución mensual
-        monthly_distribution = {}
-        for event in billing_events:
-            month_key = event.month_year
-            monthly_distribution[month_key] = monthly_distribution.get(month_key, 0) + event.amount_adjusted
+        # Distribuciones por BU y por mes sobre un solo arreglo de montos
+        amounts = np.fromiter(
+            (event.amount_adjusted for event in billing_events),
+            dtype=np.float64,
+            count=total_events
+        )
+        bu_distribution = self._sum_by_key(amounts, [event.bu.value for event in billing_events])
+        monthly_distribution = self._sum_by_key(amounts, [event.month_year for event in billing_events])
         
         return ForecastSummary(
             total_amount=total_amount,
@@ -417,6 +427,23 @@ class ForecastCalculator:
             monthly_distribution=monthly_distribution
         )
     
+    @staticmethod
+    def _sum_by_key(amounts: np.ndarray, keys: List[str]) -> Dict[str, float]:
+        """
+        Suma montos por clave codificando las claves como enteros.
+        
+        Args:
+            amounts: Montos por evento
+            keys: Clave de cada evento (BU, mes, etc.)
+            
+        Returns:
+            Dict: {clave: suma}, en orden de primera aparición
+        """
+        codes, uniques = pd.factorize(np.asarray(keys, dtype=object))
+        sums = np.zeros(len(uniques), dtype=np.float64)
+        np.add.at(sums, codes, amounts)
+        return dict(zip(uniques.tolist(), sums.tolist()))
+    
     def create_forecast_table(self, billing_events: List[BillingEvent]) -> Dict:
         """
         Crea la tabla de forecast en formato pivot.
@@ -471,9 +498,11 @@ class ForecastCalculator:
                 'BU': project_info['bu'],
                 'Empresa': project_info['company']
             }
-            for month in sorted_months:
-                amount = project_info['monthly_data'].get(month, 0)
-                row[month] = amount
+            # Todos los meses en 0 de una vez y luego solo los meses con eventos
+            # (mismo orden de columnas; los totales solo suman montos reales)
+            row.update(dict.fromkeys(sorted_months, 0))
+            row.update(project_info['monthly_data'])
+            for month, amount in project_info['monthly_data'].items():
                 monthly_totals[month] += amount
             table_data.append(row)
         
@@ -615,13 +644,12 @@ class ForecastCalculator:
                 'Costo de Venta': cost_of_sale
             }
             
-            # Colocar el costo de venta solo en el mes del último evento
-            for month in sorted_months:
-                if month == project_info['last_event_month']:
-                    row[month] = cost_of_sale
-                    monthly_totals[month] += cost_of_sale
-                else:
-                    row[month] = 0
+            # Colocar el costo de venta solo en el mes del último evento (el resto en 0),
+            # sin comparar cada mes de la tabla
+            row.update(dict.fromkeys(sorted_months, 0))
+            last_month = project_info['last_event_month']
+            row[last_month] = cost_of_sale
+            monthly_totals[last_month] += cost_of_sale
             
             table_data.append(row)
         
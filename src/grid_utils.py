@@ -6,10 +6,19 @@ las respuestas de AG-Grid, evitando errores comunes como evaluaciones
 ambiguas de DataFrames.
 """
 
+from io import BytesIO
 from typing import Dict, List, Any, Optional
+import numpy as np
 import pandas as pd
 
 
+def _csv_bytes(df: pd.DataFrame) -> bytes:
+    """CSV (UTF-8) escrito por bloques directamente a bytes, sin un str intermedio."""
+    buffer = BytesIO()
+    df.to_csv(buffer, index=False, encoding='utf-8', chunksize=10000)
+    return buffer.getvalue()
+
+
 def safe_get_grid_data(grid_response: Optional[Dict[str, Any]]) -> List[Dict]:
     """
     Obtiene los datos de la grid de forma segura.
@@ -123,18 +132,20 @@ def safe_calculate_totals(grid_response: Optional[Dict[str, Any]],
         return {col: 0.0 for col in numeric_columns}
     
     df = pd.DataFrame(data)
-    totals = {}
-    
-    for col in numeric_columns:
-        if col in df.columns:
+    totals = dict.fromkeys(numeric_columns, 0.0)
+    present_columns = [col for col in numeric_columns if col in df.columns]
+    
+    try:
+        # Una sola matriz float64 y una sola reducción para todas las columnas
+        values = df[present_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        totals.update(zip(present_columns, np.nansum(values, axis=0).tolist()))
+    except Exception:
+        # Alguna columna no convertible: se suma columna por columna
+        for col in present_columns:
             try:
-                # Convertir a numérico, manejando errores
-                numeric_series = pd.to_numeric(df[col], errors='coerce')
-                totals[col] = numeric_series.sum()
+                totals[col] = pd.to_numeric(df[col], errors='coerce').sum()
             except Exception:
                 totals[col] = 0.0
-        else:
-            totals[col] = 0.0
     
     return totals
 
@@ -233,9 +244,8 @@ class GridResponseHandler:
             return b""
         
         if format_type.lower() == "csv":
-            return self.data_df.to_csv(index=False).encode('utf-8')
+            return _csv_bytes(self.data_df)
         elif format_type.lower() == "excel":
-            from io import BytesIO
             buffer = BytesIO()
             with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
                 self.data_df.to_excel(writer, index=False, sheet_name='Data')
@@ -257,9 +267,8 @@ class GridResponseHandler:
             return b""
         
         if format_type.lower() == "csv":
-            return self.selected_df.to_csv(index=False).encode('utf-8')
+            return _csv_bytes(self.selected_df)
         elif format_type.lower() == "excel":
-            from io import BytesIO
             buffer = BytesIO()
             with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
                 self.selected_df.to_excel(writer, index=False, sheet_name='Selected')
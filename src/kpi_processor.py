@@ -345,21 +345,20 @@ class KPIProcessor:
         # Distribución por BU
         if 'Main BU' in df.columns and 'Monto Facturación' in df.columns:
             try:
-                # Limpiar Main BU para groupby
-                df_temp = df.copy()
-                df_temp['Main BU'] = df_temp['Main BU'].fillna('').astype(str).str.strip()
+                # Limpiar Main BU para groupby (solo la columna, sin copiar el DataFrame)
+                main_bu = df['Main BU'].fillna('').astype(str).str.strip()
                 
                 # Remover símbolos especiales
                 for symbol in ['↑', '↓', '→', '←', '⬆', '⬇', '➡', '⬅']:
-                    df_temp['Main BU'] = df_temp['Main BU'].str.replace(symbol, '', regex=False)
+                    main_bu = main_bu.str.replace(symbol, '', regex=False)
                 
-                df_temp['Main BU'] = df_temp['Main BU'].str.strip()
+                main_bu = main_bu.str.strip()
                 
-                # Filtrar valores nulos y vacíos
-                df_with_bu = df_temp[(df_temp['Main BU'].notna()) & (df_temp['Main BU'] != '') & (df_temp['Main BU'] != 'nan')].copy()
+                # Filtrar valores vacíos
+                has_bu = (main_bu != '') & (main_bu != 'nan')
                 
-                if not df_with_bu.empty:
-                    bu_totals = df_with_bu.groupby('Main BU', as_index=True)['Monto Facturación'].sum()
+                if has_bu.any():
+                    bu_totals = df.loc[has_bu, 'Monto Facturación'].groupby(main_bu[has_bu]).sum()
                     summary['bu_distribution'] = bu_totals.to_dict()
                     logger.info(f"Distribución por BU calculada: {len(bu_totals)} BUs")
             except Exception as e:
@@ -372,9 +371,9 @@ class KPIProcessor:
         if 'Mes Facturación' in df.columns and 'Monto Facturación' in df.columns:
             try:
                 # Filtrar valores nulos antes de agrupar
-                df_with_mes = df[df['Mes Facturación'].notna()].copy()
-                if not df_with_mes.empty:
-                    monthly_totals = df_with_mes.groupby('Mes Facturación', as_index=True)['Monto Facturación'].sum()
+                has_mes = df['Mes Facturación'].notna()
+                if has_mes.any():
+                    monthly_totals = df.loc[has_mes, 'Monto Facturación'].groupby(df.loc[has_mes, 'Mes Facturación']).sum()
                     summary['monthly_distribution'] = monthly_totals.to_dict()
                     logger.info(f"Distribución mensual calculada: {len(monthly_totals)} meses")
             except Exception as e:
@@ -284,17 +284,17 @@ class LLCKPIProcessor:
         # Distribución por BU
         if 'Main BU' in df.columns and 'Invoice Amount' in df.columns:
             try:
-                df_temp = df.copy()
-                df_temp['Main BU'] = df_temp['Main BU'].fillna('').astype(str).str.strip()
+                # Solo se limpia la columna Main BU, sin copiar el DataFrame
+                main_bu = df['Main BU'].fillna('').astype(str).str.strip()
                 
                 for symbol in ['↑', '↓', '→', '←', '⬆', '⬇', '➡', '⬅']:
-                    df_temp['Main BU'] = df_temp['Main BU'].str.replace(symbol, '', regex=False)
+                    main_bu = main_bu.str.replace(symbol, '', regex=False)
                 
-                df_temp['Main BU'] = df_temp['Main BU'].str.strip()
-                df_with_bu = df_temp[(df_temp['Main BU'].notna()) & (df_temp['Main BU'] != '') & (df_temp['Main BU'] != 'nan')].copy()
+                main_bu = main_bu.str.strip()
+                has_bu = (main_bu != '') & (main_bu != 'nan')
                 
-                if not df_with_bu.empty:
-                    bu_totals = df_with_bu.groupby('Main BU', as_index=True)['Invoice Amount'].sum()
+                if has_bu.any():
+                    bu_totals = df.loc[has_bu, 'Invoice Amount'].groupby(main_bu[has_bu]).sum()
                     summary['bu_distribution'] = bu_totals.to_dict()
                     logger.info(f"Distribución por BU (LLC) calculada: {len(bu_totals)} BUs")
             except Exception as e:
@@ -304,9 +304,9 @@ class LLCKPIProcessor:
         # Distribución mensual
         if 'Mes Facturación' in df.columns and 'Invoice Amount' in df.columns:
             try:
-                df_with_mes = df[df['Mes Facturación'].notna()].copy()
-                if not df_with_mes.empty:
-                    monthly_totals = df_with_mes.groupby('Mes Facturación', as_index=True)['Invoice Amount'].sum()
+                has_mes = df['Mes Facturación'].notna()
+                if has_mes.any():
+                    monthly_totals = df.loc[has_mes, 'Invoice Amount'].groupby(df.loc[has_mes, 'Mes Facturación']).sum()
                     summary['monthly_distribution'] = monthly_totals.to_dict()
                     logger.info(f"Distribución mensual (LLC) calculada: {len(monthly_totals)} meses")
             except Exception as e:
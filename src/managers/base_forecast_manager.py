@@ -6,9 +6,13 @@ Contiene lógica común de procesamiento y renderizado.
 import streamlit as st
 import pandas as pd
 from typing import List, Dict, Optional
+from dataclasses import replace
 from datetime import datetime
 from io import BytesIO
+import hashlib
 import logging
+import re
+import xlsxwriter
 
 from src.data_processor import DataProcessor
 from src.validators import DataValidator
@@ -19,19 +23,81 @@ from src.ui_components import (
     GRID_CONFIGS,
     create_section_header,
     render_filters_row,
+    apply_filters,
+    get_filter_signature,
+    describe_filters,
     render_totals_panel,
-    render_export_buttons
+    render_export_buttons,
+    get_excel_column_widths
 )
-from src.formatters import format_currency as fmt_currency
-from config.settings import INFO_MESSAGES, BUSINESS_RULES
+from config.settings import INFO_MESSAGES, BUSINESS_RULES, BusinessRules
 from st_aggrid import AgGrid
 
 logger = logging.getLogger(__name__)
 
+# Columnas de baja cardinalidad que se envían a AG-Grid como categóricas
+_CATEGORICAL_COLUMNS = ('Empresa', 'BU', 'Company')
+
+# Etapas del editor de porcentajes del sidebar y su campo en BusinessRules
+_BILLING_STAGE_FIELDS = (
+    ('INICIO', 'INICIO_PERCENTAGE'),
+    ('DR', 'DR_PERCENTAGE'),
+    ('FAT', 'FAT_PERCENTAGE'),
+    ('SAT', 'SAT_PERCENTAGE'),
+)
+
+
+def _file_hash(uploaded_file) -> str:
+    """Huella blake2b del contenido del archivo subido (key de caché)."""
+    with uploaded_file.getbuffer() as view:
+        return hashlib.blake2b(view, digest_size=16).hexdigest()
+
+
+def _opportunities_data_key(df_clean: pd.DataFrame, columns: List[str]) -> str:
+    """
+    Huella blake2b de los datos limpios que alimentan las oportunidades (key de
+    _compute_forecast_bundle). Es estable entre reprocesos del mismo archivo en
+    el mismo día porque DataProcessor ancla las fechas ajustadas a medianoche.
+    """
+    row_hashes = pd.util.hash_pandas_object(df_clean[columns], index=True).to_numpy()
+    return hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _read_excel_cached(file_hash: str, sheet_name, _processor: DataProcessor, _file):
+    """
+    Lee y parsea el Excel (la parte más costosa del procesamiento).
+    La key de caché es (hash del contenido, hoja): reprocesar el mismo archivo,
+    p. ej. tras cambiar las reglas de negocio, no vuelve a parsear el xlsx.
+    """
+    _file.seek(0)
+    return _processor.read_excel_file(_file, sheet_name=sheet_name)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _compute_forecast_bundle(opportunities_key: str, rules_key: str, billing_type: str,
+                             _calculator: ForecastCalculator, _opportunities: List) -> tuple:
+    """
+    Calcula eventos, resumen y tablas del forecast.
+    
+    La key de caché es (huella de los datos, reglas de negocio, tipo de
+    facturación): volver a procesar con los mismos datos y parámetros no repite
+    el cálculo. Las oportunidades se pasan con guion bajo para que Streamlit no
+    las vuelva a hashear.
+    """
+    billing_events = _calculator.calculate_forecast(_opportunities, billing_type=billing_type)
+    summary = _calculator.generate_forecast_summary(billing_events)
+    forecast_table = _calculator.create_forecast_table(billing_events)
+    cost_of_sale_table = _calculator.create_cost_of_sale_table(billing_events)
+    return billing_events, summary, forecast_table, cost_of_sale_table
+
 
 class BaseForecastManager:
     """Clase base para gestionar diferentes tipos de forecast."""
     
+    # Key del data_editor de porcentajes de facturación en session_state
+    BILLING_PERCENTAGES_KEY = 'billing_percentages_editor'
+    
     def __init__(self, sheet_name: str = 0):
         """
         Inicializa el manager con los componentes necesarios.
@@ -89,8 +155,9 @@ class BaseForecastManager:
                     st.error("❌ " + "; ".join(file_validation.errors))
                     return None
                 
-                # Paso 2: Leer archivo
-                df, parsing_report = self.processor.read_excel_file(uploaded_file, sheet_name=self.sheet_name)
+                # Paso 2: Leer archivo (cacheado por contenido del archivo)
+                file_hash = _file_hash(uploaded_file)
+                df, parsing_report = _read_excel_cached(file_hash, self.sheet_name, self.processor, uploaded_file)
             
                 # Verificar parsing exitoso
                 if not parsing_report.get('parsing_success', False):
@@ -111,11 +178,12 @@ class BaseForecastManager:
                     for warning in data_validation.warnings[:5]:
                         st.warning("⚠️ " + warning)
                 
-                # Paso 5: Convertir a objetos Opportunity
-                opportunities_all = self.processor.convert_to_opportunities(df_clean)
+                # Paso 5: Convertir a objetos Opportunity (reutilizadas si los datos limpios no cambian)
+                data_key, opportunities_all = self._get_opportunities(df_clean)
                 
-                # Actualizar reglas de negocio
-                self._update_business_rules()
+                # Reglas de negocio de esta ejecución: copia con los valores del sidebar,
+                # sin modificar la configuración global compartida entre sesiones
+                self.calculator = ForecastCalculator(self.get_business_rules())
                 
                 # Paso 6: Filtrar oportunidades según el tipo de manager
                 opportunities = self.filter_opportunities(opportunities_all)
@@ -127,14 +195,19 @@ class BaseForecastManager:
                 # Mostrar info de filtrado
                 self.show_filter_info(len(opportunities), len(opportunities_all))
                 
-                # Paso 7: Calcular forecast con tipo de facturación
+                # Paso 7-8: Calcular forecast con tipo de facturación, resumen y tablas.
+                # La huella se toma de los datos limpios (no solo del archivo) porque
+                # la limpieza depende del historial de clientes y de la fecha actual;
+                # el nombre de la clase distingue el filtro de oportunidades aplicado.
                 billing_type = getattr(st.session_state, 'billing_type', 'Contable')
-                billing_events = self.calculator.calculate_forecast(opportunities, billing_type=billing_type)
-                
-                # Paso 8: Generar resumen y tablas
-                summary = self.calculator.generate_forecast_summary(billing_events)
-                forecast_table = self.calculator.create_forecast_table(billing_events)
-                cost_of_sale_table = self.calculator.create_cost_of_sale_table(billing_events)
+                opportunities_key = f"{type(self).__name__}:{data_key}"
+                billing_events, summary, forecast_table, cost_of_sale_table = _compute_forecast_bundle(
+                    opportunities_key,
+                    repr(self.calculator.rules),
+                    billing_type,
+                    self.calculator,
+                    opportunities
+                )
                 
                 # Paso 9: Preparar resultados
                 results = self.prepare_results(
@@ -157,6 +230,30 @@ class BaseForecastManager:
             st.error(f"❌ Error: {str(e)}")
             return None
     
+    def _get_opportunities(self, df_clean: pd.DataFrame) -> tuple:
+        """
+        Convierte los datos limpios a oportunidades, reutilizando la última
+        conversión de la sesión cuando los datos no cambiaron (p. ej. al volver
+        a procesar tras mover solo los porcentajes o el factor de castigo).
+        
+        Args:
+            df_clean: DataFrame con datos limpios
+            
+        Returns:
+            Tupla (huella de las columnas que alimentan las oportunidades, lista de oportunidades)
+        """
+        columns = [column for column in self.processor.OPPORTUNITY_COLUMNS if column in df_clean.columns]
+        data_key = _opportunities_data_key(df_clean, columns)
+        
+        cache_key = f"_opportunities_cache_{type(self).__name__}"
+        cached = st.session_state.get(cache_key)
+        if cached is not None and cached[0] == data_key:
+            return cached
+        
+        opportunities = self.processor.convert_to_opportunities(df_clean)
+        st.session_state[cache_key] = (data_key, opportunities)
+        return data_key, opportunities
+    
     def filter_opportunities(self, opportunities: List) -> List:
         """
         Filtra oportunidades según el tipo de manager.
@@ -192,15 +289,82 @@ class BaseForecastManager:
         """Muestra información sobre el filtrado aplicado."""
         pass  # Opcional, puede ser sobrescrito
     
-    def _update_business_rules(self):
-        """Actualiza reglas de negocio con valores editables del session state."""
-        if hasattr(st.session_state, 'penalty_default'):
-            BUSINESS_RULES.FINANCIAL_PENALTY_FACTOR_DEFAULT = st.session_state.penalty_default
-            BUSINESS_RULES.FINANCIAL_PENALTY_FACTOR_60_PERCENT = st.session_state.penalty_60
-            BUSINESS_RULES.INICIO_PERCENTAGE = st.session_state.inicio_pct
-            BUSINESS_RULES.DR_PERCENTAGE = st.session_state.dr_pct
-            BUSINESS_RULES.FAT_PERCENTAGE = st.session_state.fat_pct
-            BUSINESS_RULES.SAT_PERCENTAGE = st.session_state.sat_pct
+    @staticmethod
+    def get_billing_percentages_frame() -> pd.DataFrame:
+        """
+        Tabla base del editor de porcentajes de facturación (valores por defecto en %).
+        
+        Returns:
+            DataFrame con columnas 'Etapa' y '%'
+        """
+        return pd.DataFrame({
+            'Etapa': [stage for stage, _ in _BILLING_STAGE_FIELDS],
+            '%': [round(getattr(BUSINESS_RULES, field) * 100) for _, field in _BILLING_STAGE_FIELDS]
+        })
+    
+    @classmethod
+    def get_billing_percentages(cls) -> Dict[str, float]:
+        """
+        Porcentajes de facturación (en %) por etapa: los valores por defecto con las
+        ediciones que el data_editor del sidebar guarda en session_state.
+        
+        Returns:
+            Dict {etapa: porcentaje}
+        """
+        percentages = {stage: round(getattr(BUSINESS_RULES, field) * 100)
+                       for stage, field in _BILLING_STAGE_FIELDS}
+        editor_state = st.session_state.get(cls.BILLING_PERCENTAGES_KEY) or {}
+        for row, changes in editor_state.get('edited_rows', {}).items():
+            value = changes.get('%')
+            if value is not None:
+                percentages[_BILLING_STAGE_FIELDS[int(row)][0]] = value
+        return percentages
+    
+    @classmethod
+    def get_business_rules(cls) -> BusinessRules:
+        """
+        Reglas de negocio vigentes: las globales con los valores (en %) de los
+        widgets del sidebar. Retorna una copia; BUSINESS_RULES no se modifica.
+        
+        Returns:
+            BusinessRules con los factores y porcentajes seleccionados
+        """
+        state = st.session_state
+        if 'penalty_default_pct' not in state:
+            return BUSINESS_RULES
+        percentages = cls.get_billing_percentages()
+        return replace(
+            BUSINESS_RULES,
+            FINANCIAL_PENALTY_FACTOR_DEFAULT=state.penalty_default_pct / 100.0,
+            FINANCIAL_PENALTY_FACTOR_60_PERCENT=state.penalty_60_pct / 100.0,
+            **{field: percentages[stage] / 100 for stage, field in _BILLING_STAGE_FIELDS}
+        )
+    
+    @staticmethod
+    def _table_to_dataframe(table: Dict) -> pd.DataFrame:
+        """
+        DataFrame de una tabla de resultados listo para filtrar y mostrar,
+        construido una sola vez por procesamiento y guardado en la propia tabla
+        (clave 'df', igual que en los resultados de KPIs).
+        
+        Las columnas de texto de baja cardinalidad pasan a categóricas: los filtros
+        comparan códigos enteros y AG-Grid las recibe como diccionario Arrow en lugar
+        de repetir cada cadena por fila. Los montos se mantienen en float64, ya que
+        float32 no conserva los centavos en montos de millones.
+        
+        Args:
+            table: Dict con la clave 'data' (lista de filas)
+            
+        Returns:
+            DataFrame de la tabla (compartido: quien lo modifique debe copiarlo)
+        """
+        if 'df' not in table:
+            df = pd.DataFrame(table['data'])
+            for column in _CATEGORICAL_COLUMNS:
+                if column in df.columns:
+                    df[column] = df[column].astype('category')
+            table['df'] = df
+        return table['df']
     
     def render_forecast_table(self, forecast_table: Dict, summary, title: str, key_prefix: str):
         """
@@ -216,7 +380,7 @@ class BaseForecastManager:
             st.warning("No hay datos para mostrar")
             return
         
-        df = pd.DataFrame(forecast_table['data'])
+        df = self._table_to_dataframe(forecast_table)
         
         # Filtros
         filter_configs = [
@@ -233,20 +397,20 @@ class BaseForecastManager:
             show_grouping = st.checkbox("Agrupar por BU", value=True, key=f"{key_prefix}_group")
         
         # Aplicar filtros
-        df_filtered = df.copy()
-        for column, value in selected_filters.items():
-            if value != 'Todas':
-                df_filtered = df_filtered[df_filtered[column] == value]
+        df_filtered = apply_filters(df, selected_filters)
+        if df_filtered.empty:
+            filter_text = describe_filters(get_filter_signature(selected_filters))
+            st.info(f"ℹ️ {INFO_MESSAGES['no_filter_results'].format(filter_text)}")
+            return
         
         # Mostrar panel de totales
         render_totals_panel(df_filtered, f"TOTALES {title.upper()}")
         
-        # Configurar AG-Grid
-        gb = AGGridConfigurator.configure_forecast_table(df_filtered)
-        
-        if selected_filters['BU'] != 'Todas' or not show_grouping:
-            gb.configure_column("BU", rowGroup=False, hide=False)
-            gb.configure_grid_options(groupDefaultExpanded=0)
+        # Configurar AG-Grid (opciones cacheadas por esquema de columnas)
+        grid_options = AGGridConfigurator.get_forecast_grid_options(
+            df_filtered,
+            group_by_bu=selected_filters['BU'] == 'Todas' and show_grouping
+        )
         
         # Renderizar AG-Grid
         grid_config = GRID_CONFIGS['forecast_main'].copy()
@@ -254,15 +418,18 @@ class BaseForecastManager:
         
         st.markdown(f"#### 📊 Tabla de {title}")
         
+        # Key fija por grid: al cambiar los filtros el componente recibe los datos nuevos sin volver a montarse
         AgGrid(
             df_filtered,
-            gridOptions=gb.build(),
+            gridOptions=grid_options,
             height=grid_config['height'],
             theme=grid_config['theme'],
             allow_unsafe_jscode=grid_config['allow_unsafe_jscode'],
             update_mode=grid_config['update_mode'],
+            update_on=grid_config['update_on'],
             fit_columns_on_grid_load=grid_config['fit_columns_on_grid_load'],
-            enable_enterprise_modules=grid_config['enable_enterprise_modules']
+            enable_enterprise_modules=grid_config['enable_enterprise_modules'],
+            key=f"{key_prefix}_grid"
         )
         
         # Exportación
@@ -283,24 +450,26 @@ class BaseForecastManager:
             st.warning("No hay datos de costo de venta disponibles")
             return
         
-        df = pd.DataFrame(cost_table['data'])
+        df = self._table_to_dataframe(cost_table)
         
-        # Métricas principales
+        # Métricas principales (totales ya calculados por ForecastCalculator, sin recorrer el DataFrame)
         col1, col2, col3 = st.columns(3)
         
-        df_for_metrics = df[df['Proyecto'] != 'TOTAL COSTO'].copy() if 'TOTAL COSTO' in df['Proyecto'].values else df.copy()
-        
         with col1:
-            st.metric(f"📋 Proyectos {title}", len(df_for_metrics))
+            st.metric(f"📋 Proyectos {title}", len(cost_table['data']))
         
         with col2:
-            if 'Costo de Venta' in df_for_metrics.columns:
-                total_cost = pd.to_numeric(df_for_metrics['Costo de Venta'], errors='coerce').sum()
+            total_cost = cost_table.get('total_cost_of_sale')
+            if total_cost is None and 'Costo de Venta' in df.columns:
+                total_cost = pd.to_numeric(df['Costo de Venta'], errors='coerce').sum()
+            if total_cost is not None:
                 st.metric(f"💸 Total Costo {title}", f"${total_cost:,.0f}")
         
         with col3:
-            if 'Gross Margin' in df_for_metrics.columns:
-                total_margin = pd.to_numeric(df_for_metrics['Gross Margin'], errors='coerce').sum()
+            total_margin = cost_table.get('total_gross_margin')
+            if total_margin is None and 'Gross Margin' in df.columns:
+                total_margin = pd.to_numeric(df['Gross Margin'], errors='coerce').sum()
+            if total_margin is not None:
                 st.metric(f"💰 Total Gross Margin {title}", f"${total_margin:,.0f}")
         
         st.markdown("---")
@@ -320,21 +489,21 @@ class BaseForecastManager:
             show_grouping = st.checkbox("Agrupar por BU", value=True, key=f"{key_prefix}_cost_group")
         
         # Aplicar filtros
-        df_filtered = df.copy()
-        for column, value in selected_filters.items():
-            if value != 'Todas':
-                df_filtered = df_filtered[df_filtered[column] == value]
+        df_filtered = apply_filters(df, selected_filters)
+        if df_filtered.empty:
+            filter_text = describe_filters(get_filter_signature(selected_filters))
+            st.info(f"ℹ️ {INFO_MESSAGES['no_filter_results'].format(filter_text)}")
+            return
         
         # Mostrar panel de totales
         from src.ui_components import render_totals_panel
         render_totals_panel(df_filtered, f"TOTALES COSTO DE VENTA {title.upper()}")
         
-        # Configurar AG-Grid
-        gb = AGGridConfigurator.configure_forecast_table(df_filtered)
-        
-        if selected_filters['BU'] != 'Todas' or not show_grouping:
-            gb.configure_column("BU", rowGroup=False, hide=False)
-            gb.configure_grid_options(groupDefaultExpanded=0)
+        # Configurar AG-Grid (opciones cacheadas por esquema de columnas)
+        grid_options = AGGridConfigurator.get_forecast_grid_options(
+            df_filtered,
+            group_by_bu=selected_filters['BU'] == 'Todas' and show_grouping
+        )
         
         # Renderizar AG-Grid
         grid_config = GRID_CONFIGS['forecast_main'].copy()
@@ -342,15 +511,18 @@ class BaseForecastManager:
         
         st.markdown(f"#### 💸 Tabla de Costo de Venta {title}")
         
+        # Key fija por grid: al cambiar los filtros el componente recibe los datos nuevos sin volver a montarse
         AgGrid(
             df_filtered,
-            gridOptions=gb.build(),
+            gridOptions=grid_options,
             height=grid_config['height'],
             theme=grid_config['theme'],
             allow_unsafe_jscode=grid_config['allow_unsafe_jscode'],
             update_mode=grid_config['update_mode'],
+            update_on=grid_config['update_on'],
             fit_columns_on_grid_load=grid_config['fit_columns_on_grid_load'],
-            enable_enterprise_modules=grid_config['enable_enterprise_modules']
+            enable_enterprise_modules=grid_config['enable_enterprise_modules'],
+            key=f"{key_prefix}_cost_grid"
         )
         
         # Exportación
@@ -358,6 +530,63 @@ class BaseForecastManager:
         from src.ui_components import render_export_buttons
         render_export_buttons(df_filtered, f'{key_prefix}_cost', f'{key_prefix}_cost_export')
     
+    @staticmethod
+    def _numeric_row_totals(df: pd.DataFrame) -> pd.Series:
+        """
+        Suma por fila de las columnas numéricas (meses) de una tabla de resultados.
+        
+        Args:
+            df: DataFrame de forecast o de costo
+            
+        Returns:
+            Serie con el total de cada fila
+        """
+        numeric_cols = [col for col in df.select_dtypes(include=['number']).columns if col != 'BU']
+        return df[numeric_cols].sum(axis=1)
+    
+    @staticmethod
+    def _safe_sheet_name(name: str, used_names: set) -> str:
+        """
+        Nombre de hoja válido para Excel: sin caracteres prohibidos ([]:*?/\\),
+        de máximo 31 caracteres y único dentro del workbook (sufijo _2, _3...).
+        
+        Args:
+            name: Nombre deseado
+            used_names: Nombres ya usados (en minúsculas); se actualiza con el nuevo
+            
+        Returns:
+            Nombre de hoja seguro
+        """
+        base = re.sub(r'[\[\]:*?/\\]', '_', str(name)).strip("'")[:31] or 'Hoja'
+        sheet_name = base
+        suffix = 2
+        while sheet_name.lower() in used_names:
+            sheet_name = f"{base[:31 - len(str(suffix)) - 1]}_{suffix}"
+            suffix += 1
+        used_names.add(sheet_name.lower())
+        return sheet_name
+    
+    @staticmethod
+    def _write_totals_sheet(workbook, df: pd.DataFrame, sheet_name: str, formats: Dict) -> None:
+        """
+        Escribe una hoja de totales (Empresa + columnas de totales) fila por fila con
+        xlsxwriter, con ancho según el contenido y formato de moneda en las columnas
+        de totales.
+        
+        Args:
+            workbook: Workbook de xlsxwriter
+            df: DataFrame con la columna Empresa y los totales
+            sheet_name: Nombre de la hoja
+            formats: Formatos del workbook ('header' y 'currency')
+        """
+        worksheet = workbook.add_worksheet(sheet_name)
+        for idx, width in enumerate(get_excel_column_widths(df)):
+            worksheet.set_column(idx, idx, width, formats['currency'] if idx > 0 else None)
+        
+        worksheet.write_row(0, 0, df.columns, formats['header'])
+        for row_idx, row in enumerate(df.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(row_idx, 0, row)
+    
     def generate_consolidated_totals_excel(self, forecast_table: Dict, cost_table: Dict, sheet_prefix: str) -> BytesIO:
         """
         Genera Excel con totales consolidados por Empresa y BU.
@@ -370,84 +599,79 @@ class BaseForecastManager:
         Returns:
             BytesIO con archivo Excel
         """
-        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+        # Empresa y BU como categóricas: las agrupaciones trabajan sobre códigos enteros
+        df_forecast = self._table_to_dataframe(forecast_table)
+        df_cost = self._table_to_dataframe(cost_table)
+        
+        # Excluir filas de totales (solo se leen: la selección basta, sin copia adicional)
+        df_forecast = df_forecast[df_forecast['Proyecto'] != 'TOTAL FORECAST']
+        df_cost = df_cost[df_cost['Proyecto'] != 'TOTAL COSTO']
         
-        df_forecast = pd.DataFrame(forecast_table['data'])
-        df_cost = pd.DataFrame(cost_table['data'])
+        return BytesIO(self._build_consolidated_totals_bytes(df_forecast, df_cost, sheet_prefix))
+    
+    @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=8)
+    def _build_consolidated_totals_bytes(df_forecast: pd.DataFrame, df_cost: pd.DataFrame, sheet_prefix: str) -> bytes:
+        """
+        Construye (y cachea) el Excel de totales consolidados.
         
-        # Excluir filas de totales
-        df_forecast = df_forecast[df_forecast['Proyecto'] != 'TOTAL FORECAST'].copy()
-        df_cost = df_cost[df_cost['Proyecto'] != 'TOTAL COSTO'].copy()
+        La key de caché es el contenido de las tablas y el prefijo: volver a
+        descargar el mismo forecast devuelve los bytes ya generados.
         
+        Args:
+            df_forecast: Tabla de forecast sin la fila de totales
+            df_cost: Tabla de costo sin la fila de totales
+            sheet_prefix: Prefijo para nombres de hojas
+            
+        Returns:
+            Contenido del archivo Excel
+        """
         buffer = BytesIO()
         
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        # Total por proyecto una sola vez; los totales por Empresa y por BU/Empresa
+        # salen de una agregación cada uno en lugar de sumar columna por columna
+        # en cada subconjunto
+        row_totals_f = BaseForecastManager._numeric_row_totals(df_forecast)
+        row_totals_c = BaseForecastManager._numeric_row_totals(df_cost)
+        
+        # Las hojas son tablas pequeñas: se escriben directo con xlsxwriter, sin pasar
+        # por to_excel, y el formato de moneda se aplica por columna con set_column
+        with xlsxwriter.Workbook(buffer, {'in_memory': True}) as workbook:
+            formats = {
+                'header': workbook.add_format({'bold': True}),
+                'currency': workbook.add_format({'num_format': '$#,##0.00'})
+            }
+            
             # Hoja 1: Totales Generales
-            totals_data_forecast = []
-            totals_data_cost = []
+            totals_f = row_totals_f.groupby(df_forecast['Empresa'], sort=False, observed=True).sum()
+            totals_c = row_totals_c.groupby(df_cost['Empresa'], observed=True).sum().reindex(totals_f.index, fill_value=0)
             
-            for empresa in df_forecast['Empresa'].unique():
-                df_empresa_f = df_forecast[df_forecast['Empresa'] == empresa]
-                df_empresa_c = df_cost[df_cost['Empresa'] == empresa]
-                
-                numeric_cols_f = df_empresa_f.select_dtypes(include=['number']).columns
-                numeric_cols_f = [col for col in numeric_cols_f if col not in ['BU']]
-                total_f = sum([pd.to_numeric(df_empresa_f[col], errors='coerce').sum() for col in numeric_cols_f])
-                
-                numeric_cols_c = df_empresa_c.select_dtypes(include=['number']).columns
-                numeric_cols_c = [col for col in numeric_cols_c if col not in ['BU']]
-                total_c = sum([pd.to_numeric(df_empresa_c[col], errors='coerce').sum() for col in numeric_cols_c])
-                
-                totals_data_forecast.append({'Empresa': empresa, f'Total Forecast {sheet_prefix}': total_f})
-                totals_data_cost.append({'Empresa': empresa, f'Total Costo {sheet_prefix}': total_c})
+            df_totals = pd.DataFrame({
+                'Empresa': totals_f.index,
+                f'Total Forecast {sheet_prefix}': totals_f.to_numpy(),
+                f'Total Costo {sheet_prefix}': totals_c.to_numpy()
+            })
             
-            df_totals_f = pd.DataFrame(totals_data_forecast)
-            df_totals_c = pd.DataFrame(totals_data_cost)
-            df_totals = pd.merge(df_totals_f, df_totals_c, on='Empresa')
+            # Nombres de hoja ya usados en el workbook (Excel no distingue mayúsculas)
+            used_sheet_names = set()
+            sheet_name = BaseForecastManager._safe_sheet_name(f'Totales {sheet_prefix}', used_sheet_names)
+            BaseForecastManager._write_totals_sheet(workbook, df_totals, sheet_name, formats)
             
-            df_totals.to_excel(writer, sheet_name=f'Totales {sheet_prefix}', index=False)
+            # Hojas por BU
+            bu_totals_f = row_totals_f.groupby([df_forecast['BU'], df_forecast['Empresa']], sort=False, observed=True).sum()
+            bu_totals_c = row_totals_c.groupby([df_cost['BU'], df_cost['Empresa']], observed=True).sum().reindex(bu_totals_f.index, fill_value=0)
             
-            # Formatear hoja de totales
-            ws_totals = writer.sheets[f'Totales {sheet_prefix}']
-            for row in ws_totals.iter_rows(min_row=2, max_row=len(df_totals)+1, min_col=2, max_col=3):
-                for cell in row:
-                    cell.number_format = '$#,##0.00'
+            # Solo BUs con algún monto: una hoja con puros ceros no aporta información
+            bu_amounts = (bu_totals_f.abs() + bu_totals_c.abs()).groupby(level='BU', sort=False, observed=True).sum()
             
-            # Hojas por BU
-            for bu in df_forecast['BU'].unique():
-                df_bu_f = df_forecast[df_forecast['BU'] == bu]
-                df_bu_c = df_cost[df_cost['BU'] == bu]
+            for bu in bu_amounts.index[bu_amounts.to_numpy() > 0]:
+                df_bu_totals = pd.DataFrame({
+                    'Empresa': bu_totals_f.loc[bu].index,
+                    'Total Forecast': bu_totals_f.loc[bu].to_numpy(),
+                    'Total Costo': bu_totals_c.loc[bu].to_numpy()
+                })
                 
-                bu_totals_f = []
-                bu_totals_c = []
-                
-                for empresa in df_bu_f['Empresa'].unique():
-                    df_empresa_f = df_bu_f[df_bu_f['Empresa'] == empresa]
-                    df_empresa_c = df_bu_c[df_bu_c['Empresa'] == empresa]
-                    
-                    numeric_cols_f = df_empresa_f.select_dtypes(include=['number']).columns
-                    numeric_cols_f = [col for col in numeric_cols_f if col not in ['BU']]
-                    total_f = sum([pd.to_numeric(df_empresa_f[col], errors='coerce').sum() for col in numeric_cols_f])
-                    
-                    numeric_cols_c = df_empresa_c.select_dtypes(include=['number']).columns
-                    numeric_cols_c = [col for col in numeric_cols_c if col not in ['BU']]
-                    total_c = sum([pd.to_numeric(df_empresa_c[col], errors='coerce').sum() for col in numeric_cols_c])
-                    
-                    bu_totals_f.append({'Empresa': empresa, 'Total Forecast': total_f})
-                    bu_totals_c.append({'Empresa': empresa, 'Total Costo': total_c})
-                
-                df_bu_totals_f = pd.DataFrame(bu_totals_f)
-                df_bu_totals_c = pd.DataFrame(bu_totals_c)
-                df_bu_totals = pd.merge(df_bu_totals_f, df_bu_totals_c, on='Empresa')
-                
-                sheet_name = f'{bu} {sheet_prefix}'
-                df_bu_totals.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                # Formatear
-                ws_bu = writer.sheets[sheet_name]
-                for row in ws_bu.iter_rows(min_row=2, max_row=len(df_bu_totals)+1, min_col=2, max_col=3):
-                    for cell in row:
-                        cell.number_format = '$#,##0.00'
-        
-        buffer.seek(0)
-        return buffer
+                sheet_name = BaseForecastManager._safe_sheet_name(f'{bu} {sheet_prefix}', used_sheet_names)
+                BaseForecastManager._write_totals_sheet(workbook, df_bu_totals, sheet_name, formats)
+        
+        return buffer.getvalue()
@@ -78,41 +78,47 @@ class ForecastLowProbManager(BaseForecastManager):
         Args:
             results: Resultados del procesamiento
             file_uploader_func: Función para renderizar file uploader
+            
+        Returns:
+            Resultados vigentes tras el render (incluye los recién procesados)
         """
         create_section_header("Forecast Pipeline", "Oportunidades < 60%", "📊")
         
-        # File uploader
-        col_upload, col_process = st.columns([3, 1])
-        with col_upload:
-            uploaded_file = file_uploader_func(
-                "📁 Subir archivo de Forecast (Oportunidades < 60%)",
-                key="forecast_low_prob_uploader",
-                help_text="Archivo Excel con oportunidades del pipeline (se filtrarán automáticamente las < 60%)"
-            )
+        # File uploader y botón en un form: elegir el archivo no provoca un rerun,
+        # la carga y el procesamiento ocurren en un solo rerun al presionar Procesar
+        with st.form("forecast_low_prob_form"):
+            col_upload, col_process = st.columns([3, 1])
+            with col_upload:
+                uploaded_file = file_uploader_func(
+                    "📁 Subir archivo de Forecast (Oportunidades < 60%)",
+                    key="forecast_low_prob_uploader",
+                    help_text="Archivo Excel con oportunidades del pipeline (se filtrarán automáticamente las < 60%)"
+                )
+            
+            with col_process:
+                submitted = st.form_submit_button("🔄 Procesar", use_container_width=True)
+        
+        if submitted:
             if uploaded_file:
                 st.session_state.uploaded_file = uploaded_file
-        
-        with col_process:
-            if st.button("🔄 Procesar", key="process_forecast_low_prob", use_container_width=True):
-                if hasattr(st.session_state, 'uploaded_file'):
-                    results = self.process_file(st.session_state.uploaded_file)
-                    if results:
-                        # Hacer merge con datos existentes para preservar otras pestañas
-                        st.session_state.forecast_results = self.merge_results_with_existing(results)
-                else:
-                    st.error("Sube un archivo primero")
+            if hasattr(st.session_state, 'uploaded_file'):
+                new_results = self.process_file(st.session_state.uploaded_file)
+                if new_results:
+                    # Hacer merge con datos existentes para preservar otras pestañas
+                    results = self.merge_results_with_existing(new_results)
+                    st.session_state.forecast_results = results
+            else:
+                st.error("Sube un archivo primero")
         
         # Verificar si hay datos
-        if not hasattr(st.session_state, 'forecast_results'):
+        if results is None:
             st.info("👆 Sube y procesa un archivo para visualizar el forecast de oportunidades < 60%")
-            return
-        
-        results = st.session_state.forecast_results
+            return results
         
         # Verificar si hay datos de oportunidades < 60%
         if results.get('forecast_table_low_prob') is None:
             st.info("ℹ️ No hay oportunidades con probabilidad menor al 60% en el forecast procesado")
-            return
+            return results
         
         # Información sobre el filtro aplicado
         st.info("📉 Esta tabla muestra únicamente oportunidades con **probabilidad < 60%** con factores de castigo aplicados")
@@ -147,7 +153,7 @@ class ForecastLowProbManager(BaseForecastManager):
                         st.error(f"Error al generar reporte: {str(e)}")
             
             with col_info:
-                st.info("📋 Incluye: Hoja 'Totales <60%' con resumen general + Una hoja por cada BU con sus totales específicos")
+                st.info("📋 Incluye: Hoja 'Totales <60%' con resumen general + Una hoja por cada BU con montos, con sus totales específicos")
         
         st.markdown("---")
         
@@ -158,6 +164,8 @@ class ForecastLowProbManager(BaseForecastManager):
             title="Forecast <60%",
             key_prefix="forecast_low_prob"
         )
+        
+        return results
     
     def render_cost_of_sale_tab(self, results: Dict):
         """
@@ -166,12 +174,10 @@ class ForecastLowProbManager(BaseForecastManager):
         Args:
             results: Resultados del procesamiento
         """
-        if not hasattr(st.session_state, 'forecast_results'):
+        if results is None:
             st.info("👈 Procesa un forecast en la pestaña 'Forecast <60%' primero")
             return
         
-        results = st.session_state.forecast_results
-        
         # Verificar si hay datos
         if results.get('cost_of_sale_table_low_prob') is None:
             st.info("ℹ️ No hay oportunidades con probabilidad menor al 60% en el forecast procesado")
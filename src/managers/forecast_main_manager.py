@@ -45,18 +45,17 @@ class ForecastMainManager(BaseForecastManager):
         processing_summary = kwargs['processing_summary']
         validation_result = kwargs['validation_result']
         parsing_report = kwargs['parsing_report']
-        opportunities_all = kwargs['opportunities_all']
         
-        # Generar también vista de oportunidades <60%
-        opportunities_low_prob = [opp for opp in opportunities_all if opp.probability < 0.60]
+        # Generar también vista de oportunidades <60%: los eventos de cada oportunidad
+        # son independientes, así que basta particionar los ya calculados (mismo
+        # tipo de facturación) en lugar de volver a calcular el forecast
+        billing_events_low_prob = [event for event in billing_events if event.probability < 0.60]
         
-        if opportunities_low_prob:
-            billing_events_low_prob = self.calculator.calculate_forecast(opportunities_low_prob)
+        if billing_events_low_prob:
             summary_low_prob = self.calculator.generate_forecast_summary(billing_events_low_prob)
             forecast_table_low_prob = self.calculator.create_forecast_table(billing_events_low_prob)
             cost_of_sale_table_low_prob = self.calculator.create_cost_of_sale_table(billing_events_low_prob)
         else:
-            billing_events_low_prob = []
             summary_low_prob = None
             forecast_table_low_prob = None
             cost_of_sale_table_low_prob = None
@@ -82,40 +81,46 @@ class ForecastMainManager(BaseForecastManager):
         Args:
             results: Resultados del procesamiento
             file_uploader_func: Función para renderizar file uploader
+            
+        Returns:
+            Resultados vigentes tras el render (incluye los recién procesados)
         """
-        # File uploader
-        col_upload, col_process = st.columns([3, 1])
-        with col_upload:
-            uploaded_file = file_uploader_func(
-                "📁 Subir archivo de Forecast de Oportunidades >= 60%",
-                key="forecast_uploader",
-                help_text="Archivo Excel con oportunidades del pipeline"
-            )
+        # File uploader y botón en un form: elegir el archivo no provoca un rerun,
+        # la carga y el procesamiento ocurren en un solo rerun al presionar Procesar
+        with st.form("forecast_form"):
+            col_upload, col_process = st.columns([3, 1])
+            with col_upload:
+                uploaded_file = file_uploader_func(
+                    "📁 Subir archivo de Forecast de Oportunidades >= 60%",
+                    key="forecast_uploader",
+                    help_text="Archivo Excel con oportunidades del pipeline"
+                )
+            
+            with col_process:
+                submitted = st.form_submit_button("🔄 Procesar", use_container_width=True)
+        
+        if submitted:
             if uploaded_file:
                 st.session_state.uploaded_file = uploaded_file
-        
-        with col_process:
-            if st.button("🔄 Procesar", key="process_forecast", use_container_width=True):
-                if hasattr(st.session_state, 'uploaded_file'):
-                    results = self.process_file(st.session_state.uploaded_file)
-                    if results:
-                        # Hacer merge con datos existentes para preservar otras pestañas
-                        st.session_state.forecast_results = self.merge_results_with_existing(results)
-                else:
-                    st.error("Sube un archivo primero")
+            if hasattr(st.session_state, 'uploaded_file'):
+                new_results = self.process_file(st.session_state.uploaded_file)
+                if new_results:
+                    # Hacer merge con datos existentes para preservar otras pestañas
+                    results = self.merge_results_with_existing(new_results)
+                    st.session_state.forecast_results = results
+            else:
+                st.error("Sube un archivo primero")
         
         # Verificar si hay datos
-        if not hasattr(st.session_state, 'forecast_results'):
+        if results is None:
             st.info("👆 Sube y procesa un archivo para visualizar el forecast")
-            return
-        
-        results = st.session_state.forecast_results
+            return results
         
         # Verificar si hay datos del forecast principal
         if results.get('summary') is None or len(results.get('forecast_table', {}).get('data', [])) == 0:
             st.info("ℹ️ No hay datos de forecast principal. Este archivo fue procesado solo para oportunidades < 60%.")
             st.info("👈 Para ver el forecast completo, procesa un archivo en esta pestaña o ve a la pestaña 'Forecast <60%'")
-            return
+            return results
         
         # Métricas principales
         self._render_key_metrics(results['summary'])
@@ -129,6 +134,8 @@ class ForecastMainManager(BaseForecastManager):
             title="Forecast",
             key_prefix="forecast"
         )
+        
+        return results
     
     def render_cost_of_sale_tab(self, results: Dict):
         """
@@ -137,12 +144,10 @@ class ForecastMainManager(BaseForecastManager):
         Args:
             results: Resultados del procesamiento
         """
-        if not hasattr(st.session_state, 'forecast_results'):
+        if results is None:
             st.info("👈 Procesa un forecast en la pestaña 'Forecast' primero")
             return
         
-        results = st.session_state.forecast_results
-        
         # Verificar si hay datos
         if results.get('cost_of_sale_table') is None or len(results['cost_of_sale_table']['data']) == 0:
             st.info("ℹ️ No hay datos de costo de venta principal. Este archivo fue procesado solo para oportunidades < 60%.")
@@ -5,6 +5,7 @@ Funciones extraídas de app.py para mejorar modularidad.
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime
 from io import BytesIO
 from openpyxl.styles import numbers
@@ -13,6 +14,20 @@ from openpyxl.styles import numbers
 from src.aggrid_utils import AGGridConfigurator, AGGridExporter, GRID_CONFIGS
 from src.grid_utils import GridResponseHandler
 from src.ui_styles import create_section_header
+from src.exporter import dataframe_to_csv_bytes
+
+
+# Columnas de texto (no se suman ni se formatean como moneda)
+_TEXT_COLUMNS = frozenset(['Proyecto', 'BU', 'Empresa', 'Company', 'Location', 'Status', 'Customer', '% Facturación'])
+
+# Mapeo de BUs a grupos (orden de presentación en el panel de totales)
+_BU_GROUPS = {
+    'TESTING': ('ICT', 'FCT'),
+    'AUTOMATION': ('IAT',),
+    'REP & TRN': ('REP', 'TRN')
+}
+_BU_GROUP_ORDER = (*_BU_GROUPS, 'OTROS')
+_BU_TO_GROUP = {bu: group_name for group_name, bus in _BU_GROUPS.items() for bu in bus}
 
 
 def render_file_uploader(label: str, key: str, file_types: list = None, help_text: str = None):
@@ -40,6 +55,41 @@ def render_file_uploader(label: str, key: str, file_types: list = None, help_tex
     return uploaded_file
 
 
+def _unique_sorted(series: pd.Series) -> list:
+    """
+    Lista ordenada de valores únicos para los selectbox de filtros.
+    
+    pd.unique es por hash (O(N)); solo se ordenan los K valores resultantes.
+    
+    Args:
+        series: Columna a filtrar
+        
+    Returns:
+        Lista ordenada de valores únicos no nulos
+    """
+    return sorted(pd.unique(series.dropna().to_numpy()))
+
+
+def get_filter_options(df: pd.DataFrame, column: str, default_option: str = 'Todas') -> list:
+    """
+    Opciones de un selectbox de filtro: la opción por defecto seguida de los
+    valores únicos ordenados de la columna.
+    
+    Args:
+        df: DataFrame con los datos
+        column: Columna a filtrar
+        default_option: Opción que representa "sin filtro"
+        
+    Returns:
+        Lista de opciones para el selectbox
+    """
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Las categorías ya son los valores únicos: no hace falta recorrer las filas
+        return [default_option] + sorted(series.cat.remove_unused_categories().cat.categories)
+    return [default_option] + _unique_sorted(series)
+
+
 def render_filters_row(df: pd.DataFrame, filter_configs: list) -> dict:
     """
     Componente reutilizable para renderizar fila de filtros.
@@ -59,7 +109,7 @@ def render_filters_row(df: pd.DataFrame, filter_configs: list) -> dict:
         with col:
             column = config['column']
             default_option = config.get('default', 'Todas')
-            options = [default_option] + sorted(df[column].dropna().unique().tolist())
+            options = get_filter_options(df, column, default_option)
             selected = st.selectbox(
                 config['label'],
                 options,
@@ -70,6 +120,87 @@ def render_filters_row(df: pd.DataFrame, filter_configs: list) -> dict:
     return selected_values
 
 
+def get_filter_signature(selected_filters: dict, default_options: tuple = ('Todas', 'Todos')) -> tuple:
+    """
+    Firma de los filtros activos: tupla de pares (columna, valor) sin las
+    opciones "sin filtro". Sirve como key de caché y para describir los filtros.
+    
+    Args:
+        selected_filters: Diccionario {columna: valor seleccionado}
+        default_options: Valores que representan "sin filtro"
+        
+    Returns:
+        Tupla hasheable con los filtros activos
+    """
+    return tuple(
+        (column, value) for column, value in selected_filters.items()
+        if value not in default_options
+    )
+
+
+def describe_filters(filter_signature: tuple) -> str:
+    """Texto legible de una firma de filtros, p. ej. 'Empresa: SAPI, BU: ICT'."""
+    return ', '.join(f"{column}: {value}" for column, value in filter_signature)
+
+
+def apply_filters(df: pd.DataFrame, selected_filters: dict, default_options: tuple = ('Todas', 'Todos')) -> pd.DataFrame:
+    """
+    Aplica los filtros seleccionados con una sola máscara booleana y una única
+    selección, sin DataFrames intermedios por cada filtro.
+    
+    Args:
+        df: DataFrame con los datos
+        selected_filters: Diccionario {columna: valor seleccionado}
+        default_options: Valores que representan "sin filtro"
+        
+    Returns:
+        DataFrame filtrado
+    """
+    # La comparación se hace sobre la Series: en columnas categóricas compara
+    # códigos enteros en lugar de materializar un array de objetos
+    masks = [
+        (df[column] == value).to_numpy()
+        for column, value in get_filter_signature(selected_filters, default_options)
+    ]
+    if not masks:
+        # Copia superficial: no duplica los datos, pero AgGrid puede añadir su
+        # columna de id sin modificar el DataFrame original
+        return df.copy(deep=False)
+    return df.loc[np.logical_and.reduce(masks)]
+
+
+def _numeric_matrix(df: pd.DataFrame, columns: list) -> np.ndarray:
+    """
+    Matriz float64 con las columnas indicadas (valores no numéricos como NaN).
+    Se construye en orden Fortran para que cada columna sea contigua y las sumas
+    por columna sean las mismas (pairwise) que las de pandas columna por columna.
+    
+    Args:
+        df: DataFrame con los datos
+        columns: Columnas a incluir
+        
+    Returns:
+        Matriz de forma (filas, columnas)
+    """
+    values = np.empty((len(df), len(columns)), dtype=np.float64, order='F')
+    for j, col in enumerate(columns):
+        series = df[col]
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors='coerce')
+        values[:, j] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return values
+
+
+def _format_money(values: pd.Series) -> pd.Series:
+    """Montos como texto de moneda ($1,234.56); los valores faltantes se muestran como $0.00."""
+    return values.fillna(0).map('${:,.2f}'.format)
+
+
+def _masked_column_sums(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Suma por columna de las filas seleccionadas por la máscara."""
+    return np.nansum(np.asfortranarray(values[mask]), axis=0)
+
+
 def render_totals_panel(df: pd.DataFrame, label: str, color: str = '#E3F2FD') -> dict:
     """
     Renderiza un panel de totales separado que siempre es visible.
@@ -83,30 +214,18 @@ def render_totals_panel(df: pd.DataFrame, label: str, color: str = '#E3F2FD') ->
         dict: Diccionario con los totales calculados
     """
     # Calcular totales solo de columnas numéricas
-    text_columns = ['Proyecto', 'BU', 'Empresa', 'Company', 'Location', 'Status', 'Customer', '% Facturación']
-    
-    totals = {}
-    for col in df.columns:
-        if col not in text_columns:
-            try:
-                total = pd.to_numeric(df[col], errors='coerce').sum()
-                if total != 0:  # Solo mostrar si hay valor
-                    totals[col] = total
-            except:
-                pass
+    value_columns = [col for col in df.columns if col not in _TEXT_COLUMNS]
+    values = _numeric_matrix(df, value_columns)
+    sums = pd.Series(np.nansum(values, axis=0), index=value_columns)
+    nonzero_sums = sums[sums != 0]  # Solo mostrar si hay valor
     
     # Mostrar panel de totales
     st.markdown(f"### 🧮 {label}")
     
     # Crear DataFrame con los totales en formato tabla
-    if totals:
-        # Crear DataFrame con una fila de totales
-        totals_df = pd.DataFrame([totals])
-        
-        # Formatear valores como moneda para visualización
-        totals_df_formatted = totals_df.copy()
-        for col in totals_df_formatted.columns:
-            totals_df_formatted[col] = totals_df_formatted[col].apply(lambda x: f"${x:,.2f}")
+    if not nonzero_sums.empty:
+        # Formatear la serie numérica una sola vez y mostrarla como fila única
+        totals_df_formatted = _format_money(nonzero_sums).to_frame().T
         
         # Mostrar tabla con st.data_editor
         st.data_editor(
@@ -125,71 +244,37 @@ def render_totals_panel(df: pd.DataFrame, label: str, color: str = '#E3F2FD') ->
         st.info("No hay totales para mostrar")
     
     # Mostrar totales agrupados por BU
-    if 'BU' in df.columns and totals:
+    if 'BU' in df.columns and not nonzero_sums.empty:
         st.markdown("#### 📊 Totales por Grupo de BU")
         
-        # Mapeo de BUs a grupos
-        bu_groups = {
-            'TESTING': ['ICT', 'FCT'],
-            'AUTOMATION': ['IAT'],
-            'REP & TRN': ['REP', 'TRN']
-        }
-        
-        # Crear función para asignar grupo
-        def assign_group(bu):
-            bu_upper = str(bu).upper().strip()
-            for group_name, bus in bu_groups.items():
-                if bu_upper in bus:
-                    return group_name
-            return 'OTROS'
+        # Asignar grupo a cada registro con un solo map vectorizado
+        bu_normalized = df['BU'].astype(str).str.upper().str.strip()
+        row_groups = bu_normalized.map(_BU_TO_GROUP).fillna('OTROS').to_numpy()
+        bu_normalized = bu_normalized.to_numpy()
         
-        # Asignar grupo a cada registro
-        df_with_group = df.copy()
-        df_with_group['Grupo'] = df_with_group['BU'].apply(assign_group)
-        
-        # Calcular totales por grupo
-        group_totals = []
-        for group_name in ['TESTING', 'AUTOMATION', 'REP & TRN', 'OTROS']:
-            group_df = df_with_group[df_with_group['Grupo'] == group_name]
-            if not group_df.empty:
-                group_row = {'Grupo': group_name}
-                for col in df.columns:
-                    if col not in text_columns:
-                        try:
-                            total = pd.to_numeric(group_df[col], errors='coerce').sum()
-                            # Siempre agregar la columna, incluso si es 0 (para mantener consistencia con tabla general)
-                            group_row[col] = total
-                        except:
-                            pass
-                if len(group_row) > 1:  # Si tiene más que solo 'Grupo'
-                    group_totals.append(group_row)
+        # Calcular totales por grupo sobre la misma matriz numérica (siempre todas las columnas,
+        # incluso en 0, para mantener consistencia con la tabla general)
+        group_labels = []
+        group_sums = []
+        for group_name in _BU_GROUP_ORDER:
+            group_mask = row_groups == group_name
+            if group_mask.any():
+                group_labels.append(group_name)
+                group_sums.append(_masked_column_sums(values, group_mask))
                 
                 # Si es TESTING, agregar ICT y FCT por separado
                 if group_name == 'TESTING':
-                    for bu_name in ['ICT', 'FCT']:
-                        bu_df = df_with_group[df_with_group['BU'].astype(str).str.upper().str.strip() == bu_name]
-                        if not bu_df.empty:
-                            bu_row = {'Grupo': f'  └─ {bu_name}'}
-                            for col in df.columns:
-                                if col not in text_columns:
-                                    try:
-                                        total = pd.to_numeric(bu_df[col], errors='coerce').sum()
-                                        # Siempre agregar la columna, incluso si es 0
-                                        bu_row[col] = total
-                                    except:
-                                        pass
-                            if len(bu_row) > 1:
-                                group_totals.append(bu_row)
+                    for bu_name in _BU_GROUPS['TESTING']:
+                        bu_mask = bu_normalized == bu_name
+                        if bu_mask.any():
+                            group_labels.append(f'  └─ {bu_name}')
+                            group_sums.append(_masked_column_sums(values, bu_mask))
         
-        if group_totals:
-            # Crear DataFrame con totales por grupo
-            group_df = pd.DataFrame(group_totals)
-            
-            # Formatear valores como moneda
-            group_df_formatted = group_df.copy()
-            for col in group_df_formatted.columns:
-                if col != 'Grupo':
-                    group_df_formatted[col] = group_df_formatted[col].apply(lambda x: f"${x:,.2f}" if pd.notna(x) else "$0.00")
+        if group_sums:
+            # Crear DataFrame con totales por grupo en una sola asignación, ya
+            # formateados como moneda (sin copia intermedia ni lambda por celda)
+            group_df_formatted = pd.DataFrame(np.vstack(group_sums), columns=value_columns).apply(_format_money)
+            group_df_formatted.insert(0, 'Grupo', group_labels)
             
             # Mostrar tabla
             st.data_editor(
@@ -214,7 +299,28 @@ def render_totals_panel(df: pd.DataFrame, label: str, color: str = '#E3F2FD') ->
             st.info("No hay datos de BU para agrupar")
     
     st.markdown("---")
-    return totals
+    return nonzero_sums.to_dict()
+
+
+def get_excel_column_widths(df: pd.DataFrame, max_width: int = 50) -> list:
+    """
+    Ancho de cada columna para Excel: el texto más largo (encabezado incluido) + 2,
+    calculado por columna con operaciones vectorizadas en lugar de celda por celda.
+    
+    Args:
+        df: DataFrame a exportar
+        max_width: Ancho máximo permitido
+        
+    Returns:
+        Lista con el ancho de cada columna, en el orden de df.columns
+    """
+    widths = []
+    for col in df.columns:
+        max_length = len(str(col))
+        if len(df):
+            max_length = max(max_length, int(df[col].astype(str).str.len().max()))
+        widths.append(min(max_length + 2, max_width))
+    return widths
 
 
 def export_to_excel_with_format(df: pd.DataFrame, sheet_name: str = 'Datos') -> BytesIO:
@@ -231,46 +337,42 @@ def export_to_excel_with_format(df: pd.DataFrame, sheet_name: str = 'Datos') ->
     buffer = BytesIO()
     
     # Identificar columnas numéricas (excluyendo columnas de texto)
-    text_columns = ['Proyecto', 'BU', 'Empresa', 'Company', 'Location', 'Status', 'Customer', '% Facturación']
-    numeric_columns = [col for col in df.columns if col not in text_columns]
+    numeric_columns = [col for col in df.columns if col not in _TEXT_COLUMNS]
+    
+    column_widths = get_excel_column_widths(df)
     
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+    # xlsxwriter aplica el formato a la columna completa con set_column, sin
+    # recorrer las celdas; el formato de moneda no altera las celdas de texto
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name=sheet_name)
         
-        # Obtener la hoja de trabajo
+        workbook = writer.book
         worksheet = writer.sheets[sheet_name]
+        currency_format = workbook.add_format({'num_format': '$#,##0.00'})
         
-        # Aplicar formato de moneda a columnas numéricas
-        for idx, col in enumerate(df.columns, start=1):
+        for idx, col in enumerate(df.columns):
             if col in numeric_columns:
-                col_letter = worksheet.cell(row=1, column=idx).column_letter
-                
-                # Aplicar formato de moneda (ej: $1,234.56)
-                for row in range(2, len(df) + 2):  # +2 porque empezamos en row 2 (después del header)
-                    cell = worksheet[f'{col_letter}{row}']
-                    try:
-                        if cell.value and isinstance(cell.value, (int, float)):
-                            cell.number_format = '$#,##0.00'
-                    except:
-                        pass
-        
-        # Ajustar ancho de columnas
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
+                # Formato de moneda (ej: $1,234.56)
+                worksheet.set_column(idx, idx, column_widths[idx], currency_format)
+            else:
+                worksheet.set_column(idx, idx, column_widths[idx])
     
     buffer.seek(0)
     return buffer
 
 
+@st.cache_data(show_spinner="Generando archivo...", max_entries=8)
+def _excel_export_bytes(df: pd.DataFrame, sheet_name: str) -> bytes:
+    """Genera (y cachea) el Excel formateado de un DataFrame ya filtrado."""
+    return export_to_excel_with_format(df, sheet_name).getvalue()
+
+
+@st.cache_data(show_spinner="Generando archivo...", max_entries=8)
+def _csv_export_bytes(df: pd.DataFrame) -> bytes:
+    """Genera (y cachea) el CSV de un DataFrame ya filtrado."""
+    return dataframe_to_csv_bytes(df)
+
+
 def render_export_buttons(df: pd.DataFrame, filename_prefix: str, key_prefix: str):
     """
     Componente reutilizable para botones de exportación.
@@ -284,10 +386,10 @@ def render_export_buttons(df: pd.DataFrame, filename_prefix: str, key_prefix: st
     
     with col1:
         if st.button("📥 Exportar Excel", key=f"{key_prefix}_excel"):
-            buffer = export_to_excel_with_format(df, filename_prefix)
+            excel_data = _excel_export_bytes(df, filename_prefix)
             st.download_button(
                 label="⬇️ Descargar Excel",
-                data=buffer.getvalue(),
+                data=excel_data,
                 file_name=f"{filename_prefix}_{datetime.now().strftime('%Y%m%d')}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 key=f"{key_prefix}_download_excel"
@@ -295,7 +397,7 @@ def render_export_buttons(df: pd.DataFrame, filename_prefix: str, key_prefix: st
     
     with col2:
         if st.button("📥 Exportar CSV", key=f"{key_prefix}_csv"):
-            csv_data = df.to_csv(index=False)
+            csv_data = _csv_export_bytes(df)
             st.download_button(
                 label="⬇️ Descargar CSV",
                 data=csv_data,
@@ -308,7 +410,11 @@ def render_export_buttons(df: pd.DataFrame, filename_prefix: str, key_prefix: st
 # Re-exportar todo para facilitar imports
 __all__ = [
     'render_file_uploader',
+    'get_filter_options',
     'render_filters_row',
+    'get_filter_signature',
+    'describe_filters',
+    'apply_filters',
     'render_totals_panel',
     'export_to_excel_with_format',
     'render_export_buttons',
@@ -0,0 +1,88 @@
+"""
+Script de prueba para validar que ForecastCalculator aplica las reglas recibidas.
+"""
+
+import sys
+import os
+sys.path.append('src')
+sys.path.append('config')
+
+from dataclasses import replace
+from datetime import datetime
+
+from config.settings import BUSINESS_RULES
+from src.forecast_calculator import ForecastCalculator
+from src.models import Opportunity, BusinessUnit, BillingStage
+
+
+def _make_opportunity(probability: float) -> Opportunity:
+    """Crea una oportunidad FCT sin PIA (facturación multi-etapa)."""
+    return Opportunity(
+        name='Proyecto Reglas',
+        bu=BusinessUnit.FCT,
+        amount=1000.0,
+        close_date=datetime(2030, 1, 15),
+        lead_time=8,
+        probability=probability
+    )
+
+
+def test_custom_rules_applied():
+    """Prueba que los porcentajes y el castigo de las reglas recibidas se usan en el cálculo."""
+    print("=== PRUEBA: ForecastCalculator(rules=...) ===")
+
+    rules = replace(
+        BUSINESS_RULES,
+        FINANCIAL_PENALTY_FACTOR_DEFAULT=0.50,
+        FINANCIAL_PENALTY_FACTOR_60_PERCENT=0.80,
+        INICIO_PERCENTAGE=0.50,
+        DR_PERCENTAGE=0.20,
+        FAT_PERCENTAGE=0.20,
+        SAT_PERCENTAGE=0.10
+    )
+    calculator = ForecastCalculator(rules=rules)
+
+    events = calculator.calculate_forecast([_make_opportunity(0.25)])
+    amounts = {event.stage: event.amount for event in events}
+    adjusted = {event.stage: event.amount_adjusted for event in events}
+
+    expected = {
+        BillingStage.INICIO: 500.0,
+        BillingStage.DR: 200.0,
+        BillingStage.FAT: 200.0,
+        BillingStage.SAT: 100.0
+    }
+    for stage, amount in expected.items():
+        print(f"   {stage.value}: {amounts[stage]:,.2f} (ajustado {adjusted[stage]:,.2f})")
+        assert abs(amounts[stage] - amount) < 1e-9
+        # Probabilidad 25% × castigo por defecto 0.50
+        assert abs(adjusted[stage] - amount * 0.25 * 0.50) < 1e-9
+
+    # Probabilidad 60%: usa el castigo específico de las reglas recibidas
+    events_60 = calculator.calculate_forecast([_make_opportunity(0.60)])
+    inicio_60 = next(event for event in events_60 if event.stage == BillingStage.INICIO)
+    assert abs(inicio_60.amount_adjusted - 500.0 * 0.60 * 0.80) < 1e-9
+
+    print("✅ Las reglas recibidas se aplican a montos y ajustes")
+
+
+def test_default_rules_unchanged():
+    """Prueba que sin reglas se usan las globales y que éstas no se modifican."""
+    print("\n=== PRUEBA: Reglas por defecto ===")
+
+    # replace() crea una copia: las reglas globales no deben cambiar
+    replace(BUSINESS_RULES, INICIO_PERCENTAGE=0.90)
+    calculator = ForecastCalculator()
+
+    assert calculator.rules is BUSINESS_RULES
+    events = calculator.calculate_forecast([_make_opportunity(0.25)])
+    inicio = next(event for event in events if event.stage == BillingStage.INICIO)
+    assert abs(inicio.amount - 1000.0 * BUSINESS_RULES.INICIO_PERCENTAGE) < 1e-9
+
+    print(f"✅ INICIO con reglas globales: {inicio.amount:,.2f}")
+
+
+if __name__ == "__main__":
+    test_custom_rules_applied()
+    test_default_rules_unchanged()
+    print("\n🎉 Pruebas de reglas de negocio completadas!")
@@ -0,0 +1,125 @@
+"""
+Script de prueba para validar el llenado del reporte consolidado a partir de
+resultados fijos de forecast y KPIs.
+"""
+
+import sys
+import os
+sys.path.append('src')
+sys.path.append('config')
+
+from datetime import datetime
+
+import openpyxl
+
+from src.consolidated_report_generator import ConsolidatedReportGenerator
+
+# Orden de BUs, secciones y Locations del template (una fila por combinación)
+BUS = ['TODAS', 'TESTING', 'ICT', 'FCT', 'IAT', 'REP', 'OTROS']
+SECTIONS = ['kpi_billing', 'kpi_cost', 'forecast_table', 'forecast_table_low_prob',
+            'cost_of_sale_table', 'cost_of_sale_table_low_prob']
+LOCATIONS = ['SAPI', 'LLC']
+
+
+def _kpi_row(project, bu, location, jan, feb, cost):
+    """Crea un proyecto de la tabla de KPIs."""
+    return {
+        'Proyecto': project, 'BU': bu, 'Location': location, 'Status': 'Open',
+        'Customer': 'Cliente', 'Total PO': jan + feb, '% Facturación': 1.0,
+        'Costo de Venta': cost, 'January 2030': jan, 'February 2030': feb
+    }
+
+
+def _forecast_row(name, bu, empresa, jan, feb):
+    """Crea una fila de una tabla de forecast."""
+    return {'Proyecto': name, 'BU': bu, 'Empresa': empresa, 'January 2030': jan, 'February 2030': feb}
+
+
+def _build_report():
+    """Genera el reporte con resultados fijos y retorna la hoja llenada."""
+    kpi_results = {'data': [
+        _kpi_row('P1', 'ICT', 'SAPI', 100.0, 50.0, 30.0),
+        _kpi_row('P2', 'FCT', 'LLC', 200.0, 0.0, 80.0),
+        _kpi_row('P3', 'IAT', 'SAPI', 0.0, 70.0, 10.0),
+    ]}
+    forecast_results = {
+        'forecast_table': {'data': [
+            _forecast_row('F1', 'ICT', 'SAPI', 10.0, 20.0),
+            _forecast_row('F2', 'SWD', 'LLC', 5.0, 0.0),
+            _forecast_row('F3', 'REP', 'SAPI', 0.0, 40.0),
+        ]},
+        'forecast_table_low_prob': {'data': [
+            _forecast_row('F4', 'FCT', 'SAPI', 7.0, 3.0),
+        ]},
+        'cost_of_sale_table': {'data': []},
+        'cost_of_sale_table_low_prob': None,
+    }
+
+    buffer = ConsolidatedReportGenerator().generate_report(forecast_results, kpi_results)
+    return openpyxl.load_workbook(buffer)['Hoja2']
+
+
+def _row(ws, bu, section, location):
+    """Fila del template para una BU, sección y Location (valida la Location)."""
+    row = 2 + BUS.index(bu) * 12 + SECTIONS.index(section) * 2 + LOCATIONS.index(location)
+    # El template no trae etiquetas para el último bloque (OTROS)
+    assert ws.cell(row=row, column=2).value in (location, None)
+    return row
+
+
+def _months(ws, bu, section, location):
+    """Valores de enero y febrero de 2030 de una fila del reporte."""
+    row = _row(ws, bu, section, location)
+    return ws.cell(row=row, column=4).value, ws.cell(row=row, column=5).value
+
+
+def test_consolidated_report_values():
+    """Prueba que cada fila del reporte suma los datos de su BU, sección y Location."""
+    print("=== PRUEBA: Reporte Consolidado ===")
+
+    ws = _build_report()
+
+    # Encabezados de meses como fechas, en orden cronológico
+    assert ws['D1'].value == datetime(2030, 1, 1)
+    assert ws['E1'].value == datetime(2030, 2, 1)
+
+    expected = {
+        # Facturación por Backlog PM (KPIs)
+        ('TODAS', 'kpi_billing', 'SAPI'): (100.0, 120.0),
+        ('TODAS', 'kpi_billing', 'LLC'): (200.0, None),
+        ('TESTING', 'kpi_billing', 'SAPI'): (100.0, 50.0),
+        ('TESTING', 'kpi_billing', 'LLC'): (200.0, None),
+        ('IAT', 'kpi_billing', 'SAPI'): (None, 70.0),
+        ('REP', 'kpi_billing', 'SAPI'): (None, None),
+        # Costo de venta de KPIs: todo en el último mes con facturación
+        ('TODAS', 'kpi_cost', 'SAPI'): (None, 40.0),
+        ('TODAS', 'kpi_cost', 'LLC'): (80.0, None),
+        ('ICT', 'kpi_cost', 'SAPI'): (None, 30.0),
+        # Forecast >= 60%: REP es BU individual y OTROS incluye SWD
+        ('TODAS', 'forecast_table', 'SAPI'): (10.0, 60.0),
+        ('REP', 'forecast_table', 'SAPI'): (None, 40.0),
+        ('OTROS', 'forecast_table', 'SAPI'): (None, None),
+        ('OTROS', 'forecast_table', 'LLC'): (5.0, None),
+        # Forecast < 60%
+        ('TESTING', 'forecast_table_low_prob', 'SAPI'): (7.0, 3.0),
+        ('FCT', 'forecast_table_low_prob', 'SAPI'): (7.0, 3.0),
+        ('ICT', 'forecast_table_low_prob', 'SAPI'): (None, None),
+        # Fuentes sin datos quedan vacías
+        ('TODAS', 'cost_of_sale_table', 'SAPI'): (None, None),
+        ('TODAS', 'cost_of_sale_table_low_prob', 'LLC'): (None, None),
+    }
+
+    for (bu, section, location), values in expected.items():
+        actual = _months(ws, bu, section, location)
+        print(f"   {bu:8} {section:28} {location:5} {actual}")
+        assert actual == values, f"{bu}/{section}/{location}: esperado {values}, obtenido {actual}"
+
+    # Las celdas con datos llevan formato de moneda
+    assert ws.cell(row=_row(ws, 'TODAS', 'kpi_billing', 'SAPI'), column=4).number_format == '$#,##0.00'
+
+    print("✅ Valores del reporte consolidado correctos")
+
+
+if __name__ == "__main__":
+    test_consolidated_report_values()
+    print("\n🎉 Pruebas del reporte consolidado completadas!")
@@ -88,7 +88,68 @@ def test_with_dataframe():
         status = "📅 AJUSTADA" if original != processed else "✅ SIN CAMBIO"
         print(f"   {row['Opportunity Name']}: {original} → {processed} {status}")
 
+def test_past_dates_anchored_to_midnight():
+    """Las fechas de meses pasados se ajustan a medianoche: reprocesar da las mismas fechas."""
+    print("\n=== PRUEBA: Ajuste a Medianoche ===")
+    
+    import calendar
+    from src.managers.base_forecast_manager import _opportunities_data_key
+    
+    processor = DataProcessor()
+    today = datetime.now()
+    last_day = calendar.monthrange(today.year, today.month)[1]
+    
+    adjusted = processor._adjust_current_month_dates(datetime(2020, 5, 5, 15, 30))
+    print(f"   05/05/2020 15:30 → {adjusted}")
+    assert adjusted == datetime(today.year, today.month, last_day)
+    
+    # Dos limpiezas del mismo archivo producen la misma huella de datos
+    test_data = pd.DataFrame({
+        'Close Date': ['05/05/2020', '20/12/2099'],
+        'Opportunity Name': ['Proyecto A', 'Proyecto B']
+    })
+    first = processor._convert_dates(test_data)
+    second = processor._convert_dates(test_data)
+    columns = ['Opportunity Name', 'close_date_parsed']
+    assert _opportunities_data_key(first, columns) == _opportunities_data_key(second, columns)
+    print("   ✅ Misma huella de datos en ambos procesamientos")
+
+def test_opportunities_reused_for_same_data():
+    """Con la misma huella de datos se reutiliza la lista de oportunidades ya convertida."""
+    print("\n=== PRUEBA: Reutilización de Oportunidades ===")
+    
+    import streamlit as st
+    from src.managers import ForecastMainManager
+    
+    manager = ForecastMainManager()
+    st.session_state.pop(f"_opportunities_cache_{type(manager).__name__}", None)
+    
+    df_clean = pd.DataFrame({
+        'Opportunity Name': ['Proyecto A'],
+        'BU': ['ICT'],
+        'Amount': [100000.0],
+        'close_date_parsed': [datetime(2099, 1, 15)],
+        'Lead Time': [8.0],
+        'probability_assigned': [0.6],
+        'Paid in Advance': [0.0],
+        'Payment Terms': ['NET 30']
+    })
+    
+    key_first, first = manager._get_opportunities(df_clean)
+    key_second, second = manager._get_opportunities(df_clean.copy())
+    assert len(first) == 1
+    assert key_second == key_first and second is first
+    print("   ✅ Mismos datos: se reutiliza la conversión")
+    
+    changed = df_clean.assign(Amount=[200000.0])
+    key_changed, third = manager._get_opportunities(changed)
+    assert key_changed != key_first and third is not first
+    assert third[0].amount == 200000.0
+    print("   ✅ Datos distintos: se vuelve a convertir")
+
 if __name__ == "__main__":
     test_date_adjustment()
     test_with_dataframe()
+    test_past_dates_anchored_to_midnight()
+    test_opportunities_reused_for_same_data()
     print("\n🎉 Pruebas de ajuste de fechas completadas!")